@@ -1,10 +1,41 @@
-# Weather — Click on Map (instant update + city popup, using st.rerun)
+# Weather — Click on Map (instant update + city popup, single script run per click)
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import streamlit as st
-from streamlit_folium import st_folium
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit_folium import generate_leaflet_string, st_folium
 import folium
 
+import tzgrid
+from forecast import (CURRENT_VARS, DAILY_VARS, HOURLY_VARS, WeatherApiResponse, as_float, bilinear, convert,
+                      flatbuffers_messages, fmt, parse_forecast, parse_forecast_flatbuffers, snap_point)
+from metrics import Metrics
+from ratelimit import RateLimiter, background_priority, is_background
+from swrcache import DiskCache, SWRCache
+
+try:  # optional: k-d tree for the offline geocoder (falls back to a NumPy scan)
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+try:  # optional: faster JSON decoding for every Open-Meteo response (falls back to stdlib json)
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 st.set_page_config(page_title="Weather — Click on Map", page_icon="⛅", layout="wide")
 
 # ---------------- Open-Meteo endpoints ----------------
@@ -12,52 +43,561 @@ REVERSE = "https://geocoding-api.open-meteo.com/v1/reverse"
 FORECAST = "https://api.open-meteo.com/v1/forecast"
 TIMEZONE_API = "https://timezone.open-meteo.com/v1/timezone"
 
+# Where a clicked point's timezone comes from when reverse geocoding has none:
+# "forecast" reads it from the forecast payload (timezone=auto), "api" asks timezone.open-meteo.com.
+TZ_SOURCE = os.environ.get("WEATHER_TZ_SOURCE", "forecast")
+
+# Offline reverse geocoding: bundled GeoNames cities (pop ≥ 15k); clicks farther than
+# OFFLINE_MAX_KM from any of them fall back to the Open-Meteo reverse API.
+CITIES_PATH = os.environ.get("WEATHER_CITIES_PATH", os.path.join(os.path.dirname(__file__), "data", "cities.csv.gz"))
+OFFLINE_MAX_KM = float(os.environ.get("WEATHER_OFFLINE_MAX_KM", "25"))
+
+# Offline timezone lookup: raster grid built by build_tz_grid.py, memory-mapped so every
+# worker process on the node shares one copy through the page cache. Missing grid → API.
+TZ_GRID_PATH = os.environ.get("WEATHER_TZ_GRID_PATH", os.path.join(os.path.dirname(__file__), "data", "tz_grid.npy"))
+
+# Forecast cache keys are snapped to a spatial grid so nearby clicks share one entry:
+# a step in degrees (≈ model grid, 0.05° ≈ 5 km) or "geohash:<precision>" for geohash cells.
+FORECAST_SNAP = os.environ.get("WEATHER_FORECAST_SNAP", "0.05")
+
+# Second cache tier on disk, shared by every worker process on the node and surviving restarts.
+# Set to "" to keep caches in memory only. Every CACHE_DB_PRUNE_EVERY writes, expired rows are
+# deleted and then the oldest rows beyond CACHE_DB_MAX_ROWS.
+CACHE_DB_PATH = os.environ.get("WEATHER_CACHE_DB", os.path.join(os.path.dirname(__file__), "data", "cache.sqlite"))
+CACHE_DB_MAX_ROWS = int(os.environ.get("WEATHER_CACHE_DB_MAX_ROWS", "200000"))
+CACHE_DB_PRUNE_EVERY = 1000
+
+# Cache warm-up: hot locations (CSV with name, latitude, longitude) plus the WARMUP_TOP_N most
+# requested forecast keys are re-fetched every WARMUP_INTERVAL s, at most WARMUP_RATE upstream req/s.
+HOT_LOCATIONS_PATH = os.environ.get("WEATHER_HOT_LOCATIONS", os.path.join(os.path.dirname(__file__), "data", "hot_locations.csv"))
+WARMUP_INTERVAL = float(os.environ.get("WEATHER_WARMUP_INTERVAL", "600"))
+WARMUP_TOP_N = int(os.environ.get("WEATHER_WARMUP_TOP_N", "100"))
+WARMUP_RATE = float(os.environ.get("WEATHER_WARMUP_RATE", "2"))
+WARMUP_THREAD = "cache-warmup"  # its lookups are not user demand: kept out of the access log
+
+# One "weather" log line per click with its phase timings, at WEATHER_LOG_LEVEL (default INFO).
+log = logging.getLogger("weather")
+if not log.handlers:  # the logger outlives reruns; configure it once per process
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    log.addHandler(_handler)
+    log.setLevel(os.environ.get("WEATHER_LOG_LEVEL", "INFO").upper())
+    log.propagate = False
+
+# Forecast transport: "json", or "flatbuffers" (binary, decoded zero-copy; needs openmeteo-sdk).
+FORECAST_FORMAT = os.environ.get("WEATHER_FORECAST_FORMAT", "json")
+
+# Locations per multi-coordinate forecast request in fetch_forecasts.
+FORECAST_BATCH = int(os.environ.get("WEATHER_FORECAST_BATCH", "100"))
+
+# Map overlay grid: fixed TILE_DEG° tiles of TILE_NODES×TILE_NODES forecast nodes, shared by all
+# sessions and zoom levels; viewports needing more than OVERLAY_MAX_TILES tiles show no overlay.
+TILE_DEG = float(os.environ.get("WEATHER_TILE_DEG", "4"))
+TILE_NODES = int(os.environ.get("WEATHER_TILE_NODES", "4"))
+OVERLAY_MAX_TILES = int(os.environ.get("WEATHER_OVERLAY_MAX_TILES", "48"))
+
+# Click forecasts: "direct" fetches the clicked point; "grid" interpolates the four surrounding
+# overlay-grid nodes (cached and shared), falling back to a direct fetch across timezones or
+# where node elevations differ by more than GRID_MAX_RELIEF_M (complex terrain).
+CLICK_SOURCE = os.environ.get("WEATHER_CLICK_SOURCE", "direct")
+GRID_MAX_RELIEF_M = float(os.environ.get("WEATHER_GRID_MAX_RELIEF_M", "300"))
+
+# Upstream rate limits: token bucket per host as (tokens/s, burst), overridable with
+# WEATHER_RATE_<FORECAST|GEOCODING|TIMEZONE>="rate,burst". Buckets live in a SQLite file shared by
+# all worker processes on the node ("" disables limiting). Background traffic (warm-up, stale
+# refreshes) may only draw while RATE_BG_RESERVE of the burst stays free for interactive clicks.
+RATE_DB_PATH = os.environ.get("WEATHER_RATE_DB", os.path.join(os.path.dirname(__file__), "data", "ratelimit.sqlite"))
+RATE_BG_RESERVE = float(os.environ.get("WEATHER_RATE_BG_RESERVE", "0.5"))
+RATE_MAX_WAIT = {False: 5.0, True: 60.0}  # seconds an interactive / background call may queue
+
+def rate_setting(name: str, rate: float, burst: float):
+    """(rate, burst) from WEATHER_RATE_<NAME>; a rate of 0 never refills, so the burst is all there is."""
+    var = f"WEATHER_RATE_{name.upper()}"
+    raw = os.environ.get(var)
+    if not raw:
+        return rate, burst
+    rate, burst = (float(x) for x in raw.split(","))
+    if rate < 0 or burst <= 0:
+        raise ValueError(f'{var}="{raw}": need tokens_per_second >= 0 and burst > 0')
+    return rate, burst
+
+# ---------------- Metrics (process-wide counters and phase histograms) ----------------
+@st.cache_resource(show_spinner=False)
+def metrics() -> Metrics:
+    return Metrics()
+
+@contextmanager
+def timed(phase: str, into: dict = None):
+    """Record the block's duration in the `phase` histogram (and in `into`, if given)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        metrics().observe(phase, dt)
+        if into is not None:
+            into[phase] = dt
+
+def call_timed(phase: str, into: dict, fn, *args):
+    with timed(phase, into):
+        return fn(*args)
+
+# ---------------- Rate limiting (token buckets shared across processes) ----------------
+RATE_LIMITS = {
+    urlsplit(FORECAST).netloc: rate_setting("forecast", 5, 30),
+    urlsplit(REVERSE).netloc: rate_setting("geocoding", 5, 20),
+    urlsplit(TIMEZONE_API).netloc: rate_setting("timezone", 5, 20),
+}
+
+@st.cache_resource(show_spinner=False)
+def rate_limiter():
+    try:
+        return RateLimiter(RATE_DB_PATH, RATE_LIMITS, RATE_BG_RESERVE, RATE_MAX_WAIT, metrics()) if RATE_DB_PATH else None
+    except sqlite3.Error:
+        return None  # unwritable location: no limiting rather than no weather
+
+def batch_size(url: str, size: int) -> int:
+    """Locations per request to `url` for this thread (see RateLimiter.batch_size)."""
+    limiter = rate_limiter()
+    return size if limiter is None else limiter.batch_size(urlsplit(url).netloc, size)
+
+# ---------------- HTTP client (one pooled keep-alive session per host) ----------------
+# (connect, read) seconds per endpoint; connect stays short since sockets are reused
+TIMEOUTS = {REVERSE: (3.05, 15), TIMEZONE_API: (3.05, 10), FORECAST: (3.05, 20)}
+POOL_SIZE = 32  # max idle keep-alive connections kept per host (≈ concurrent sessions)
+BACKGROUND_WORKERS = 8  # stale refreshes and overlay backfills, which may sleep on the rate limiter
+
+@st.cache_resource(show_spinner=False)
+def http_session(host: str) -> requests.Session:
+    """Process-wide session for `host`, shared by every Streamlit session/thread."""
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, pool_block=False)
+    s.mount(f"https://{host}", adapter)
+    s.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    return s
+
+def http_get(url: str, params: dict, cost: int = 1) -> requests.Response:
+    """GET through the host's pooled session once `cost` rate-limit tokens are granted."""
+    host = urlsplit(url).netloc
+    limiter = rate_limiter()
+    if limiter is not None:
+        with timed(f"ratelimit.{host}"):
+            limiter.acquire(host, cost)
+    metrics().inc(f"upstream.{host}")
+    metrics().inc("upstream")
+    if not is_background():
+        metrics().inc("upstream.interactive")  # requests a page run waited on
+    with timed(f"http.{host}"):
+        r = http_session(host).get(url, params=params, timeout=TIMEOUTS[url])
+    if r.status_code == 429:
+        metrics().inc(f"upstream.{host}.429")
+    r.raise_for_status()
+    return r
+
+def http_json(url: str, params: dict, cost: int = 1):
+    """Decoded JSON body of a GET, via orjson when installed."""
+    r = http_get(url, params, cost)
+    with timed(f"json.{urlsplit(url).netloc}"):
+        return json_loads(r.content)
+
+@st.cache_resource(show_spinner=False)
+def io_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="open-meteo")
+
+@st.cache_resource(show_spinner=False)
+def background_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="open-meteo-bg")
+
+def submit(fn, *args, background: bool = False):
+    """Run `fn(*args)` on the shared I/O pool, carrying the caller's script context
+    so Streamlit calls inside the worker behave as in the main thread. Background jobs run
+    at background priority on their own pool: they can wait up to a minute for rate-limit
+    tokens, and a click's lookups must never queue behind them."""
+    ctx = get_script_run_ctx()
+    def run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        if not background:
+            return fn(*args)
+        with background_priority():
+            return fn(*args)
+    return (background_pool() if background else io_pool()).submit(run)
+
+# ---------------- Stale-while-revalidate cache ----------------
+# Per helper (soft, hard) TTL in seconds, overridable as WEATHER_TTL_<NAME>="soft,hard".
+# Younger than soft: fresh. Between soft and hard: served stale while one background
+# refresh runs. Older than hard: the caller blocks on a fetch.
+def ttl_setting(name: str, soft: int, hard: int):
+    raw = os.environ.get(f"WEATHER_TTL_{name.upper()}")
+    return tuple(int(x) for x in raw.split(",")) if raw else (soft, hard)
+
+CACHE_TTLS = {
+    "reverse_geocode_api": ttl_setting("reverse_geocode", 3600, 6 * 3600),
+    "get_timezone_api": ttl_setting("timezone", 86400, 7 * 86400),
+    "fetch_forecast_api": ttl_setting("forecast", 900, 3 * 3600),
+}
+
+# In-memory budget per helper in MB (WEATHER_CACHE_MB_<NAME>); least recently used entries go first.
+def budget_setting(name: str, mb: float) -> int:
+    return int(float(os.environ.get(f"WEATHER_CACHE_MB_{name.upper()}", mb)) * 2**20)
+
+CACHE_BUDGETS = {
+    "reverse_geocode_api": budget_setting("reverse_geocode", 16),
+    "get_timezone_api": budget_setting("timezone", 4),
+    "fetch_forecast_api": budget_setting("forecast", 128),
+}
+
+CACHE_SCHEMA = 4  # bump when a cached helper's return shape changes; older disk rows are ignored
+
+@st.cache_resource(show_spinner=False)
+def swr_cache() -> SWRCache:
+    try:
+        disk = DiskCache(CACHE_DB_PATH, CACHE_SCHEMA, CACHE_DB_MAX_ROWS, CACHE_DB_PRUNE_EVERY) if CACHE_DB_PATH else None
+    except sqlite3.Error:
+        disk = None  # read-only or missing directory: memory tier only
+    return SWRCache(disk, CACHE_BUDGETS, metrics(), functools.partial(submit, background=True), WARMUP_THREAD)
+
+def cached(fn):
+    """Memoize `fn` in the process-wide SWR cache with its CACHE_TTLS entry."""
+    soft, hard = CACHE_TTLS[fn.__name__]
+    @functools.wraps(fn)
+    def wrapper(*args):
+        return swr_cache().get((fn.__name__, *args), lambda: fn(*args), soft, hard)
+    return wrapper
+
+# ---------------- Offline reverse geocoder (nearest city on the unit sphere) ----------------
+EARTH_KM = 6371.0088
+
+def unit_xyz(lat, lon) -> np.ndarray:
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+class CityIndex:
+    def __init__(self, cities: pd.DataFrame):
+        self.records = cities.to_dict("records")
+        self.xyz = unit_xyz(cities["latitude"].to_numpy(), cities["longitude"].to_numpy())
+        self.tree = cKDTree(self.xyz) if cKDTree is not None else None
+
+    def nearest(self, lat: float, lon: float):
+        """Nearest city as (record, great-circle km)."""
+        p = unit_xyz(lat, lon)
+        if self.tree is not None:
+            chord, i = self.tree.query(p)
+        else:
+            dots = self.xyz @ p
+            i = int(dots.argmax())
+            chord = np.sqrt(max(0.0, 2.0 - 2.0 * dots[i]))
+        return self.records[int(i)], float(2 * EARTH_KM * np.arcsin(min(1.0, chord / 2)))
+
+@st.cache_resource(show_spinner=False)
+def city_index():
+    try:
+        cities = pd.read_csv(CITIES_PATH, keep_default_na=False, dtype={"admin1": str})
+    except OSError:
+        return None
+    return CityIndex(cities)
+
+def reverse_geocode_offline(lat: float, lon: float):
+    idx = city_index()
+    if idx is None:
+        return None
+    city, km = idx.nearest(lat, lon)
+    return dict(city) if km <= OFFLINE_MAX_KM else None
+
+# ---------------- Offline timezone resolver (memory-mapped raster grid) ----------------
+@st.cache_resource(show_spinner=False)
+def timezone_grid():
+    try:
+        return tzgrid.load(TZ_GRID_PATH)  # border cells are answered by exact polygon tests
+    except OSError:
+        return None
+
+def get_timezone_offline(lat: float, lon: float):
+    grid = timezone_grid()
+    return grid.lookup(lat, lon) if grid is not None else None
+
 # ---------- helpers ----------
-@st.cache_data(ttl=3600, show_spinner=False)
 def reverse_geocode(lat: float, lon: float, language: str = "en"):
+    """Nearest bundled city when close enough (English names only), else the Open-Meteo API."""
+    if language == "en":
+        rev = reverse_geocode_offline(lat, lon)
+        if rev:
+            metrics().inc("reverse.offline")
+            return rev
     try:
-        r = requests.get(REVERSE, params={"latitude": lat, "longitude": lon, "language": language}, timeout=15)
-        r.raise_for_status()
-        results = r.json().get("results") or []
-        return results[0] if results else None
-    except Exception:
+        return reverse_geocode_api(lat, lon, language)
+    except Exception:  # throttled or unreachable: nothing was cached, a later click retries
+        metrics().inc("reverse.failed")
         return None
 
-@st.cache_data(ttl=86400, show_spinner=False)
+@cached
+def reverse_geocode_api(lat: float, lon: float, language: str = "en"):
+    results = http_json(REVERSE, {"latitude": lat, "longitude": lon, "language": language}).get("results") or []
+    return results[0] if results else None
+
 def get_timezone(lat: float, lon: float):
+    """Timezone from the offline grid when available, else timezone.open-meteo.com."""
+    tz = get_timezone_offline(lat, lon)
+    if tz:
+        metrics().inc("timezone.offline")
+        return tz
     try:
-        r = requests.get(TIMEZONE_API, params={"latitude": lat, "longitude": lon}, timeout=10)
-        r.raise_for_status()
-        return (r.json() or {}).get("timezone", "auto")
-    except Exception:
+        return get_timezone_api(lat, lon)
+    except Exception:  # throttled or unreachable: nothing was cached, a later click retries
+        metrics().inc("timezone.failed")
         return "auto"
 
-@st.cache_data(ttl=900, show_spinner=False)
-def fetch_forecast(lat: float, lon: float, tz: str, metric: bool):
+@cached
+def get_timezone_api(lat: float, lon: float):
+    return (http_json(TIMEZONE_API, {"latitude": lat, "longitude": lon}) or {}).get("timezone", "auto")
+
+def fetch_forecast(lat: float, lon: float, tz: str, count: bool = True):
+    """SI-unit forecast (°C, km/h, mm) for the snap cell around (lat, lon); see `convert`.
+    `count=False` keeps re-renders of an already counted forecast out of the demand counters
+    (forecast.calls / forecast.misses) behind the cache hit rate."""
+    if CLICK_SOURCE == "grid" and tz == "auto":
+        forecast = interpolated_forecast(lat, lon, count)
+        if forecast is not None:
+            return forecast
+    key = ("fetch_forecast_api", *map(float, snap_point(lat, lon, FORECAST_SNAP)), tz)
+    if count:
+        hit = swr_cache().peek(key)
+        metrics().inc("forecast.calls")
+        if hit is None or time.time() - hit[0] >= CACHE_TTLS["fetch_forecast_api"][1]:
+            metrics().inc("forecast.misses")
+    return fetch_forecast_api(*key[1:])
+
+def request_forecasts(points: list, tz: str) -> list:
+    """One upstream request for all `points` (Open-Meteo takes comma-separated coordinate
+    lists); returns the parsed forecasts in the same order."""
     params = {
-        "latitude": lat, "longitude": lon, "timezone": tz or "auto",
-        "current": ["temperature_2m","apparent_temperature","relative_humidity_2m","wind_speed_10m"],
-        "hourly": ["temperature_2m","precipitation","wind_speed_10m"],
-        "daily": ["temperature_2m_max","temperature_2m_min","precipitation_sum","wind_speed_10m_max"],
+        "latitude": ",".join(str(lat) for lat, _ in points),
+        "longitude": ",".join(str(lon) for _, lon in points),
+        "timezone": tz or "auto",
+        "current": CURRENT_VARS,
+        "hourly": HOURLY_VARS,
+        "daily": DAILY_VARS,
         "forecast_days": 7,
-        "temperature_unit": "celsius" if metric else "fahrenheit",
-        "wind_speed_unit": "kmh" if metric else "mph",
+        "temperature_unit": "celsius",
+        "wind_speed_unit": "kmh",
         "precipitation_unit": "mm",
     }
-    r = requests.get(FORECAST, params=params, timeout=20)
-    r.raise_for_status()
-    return r.json()
+    if FORECAST_FORMAT == "flatbuffers" and WeatherApiResponse is not None:
+        r = http_get(FORECAST, dict(params, format="flatbuffers"), cost=len(points))
+        with timed("forecast.parse"):
+            return [parse_forecast_flatbuffers(m) for m in flatbuffers_messages(r.content)]
+    payload = http_json(FORECAST, params, cost=len(points))  # Open-Meteo bills each location
+    with timed("forecast.parse"):
+        return [parse_forecast(p) for p in (payload if isinstance(payload, list) else [payload])]
+
+@cached
+def fetch_forecast_api(lat: float, lon: float, tz: str):
+    return request_forecasts([(lat, lon)], tz)[0]
+
+def fetch_forecasts(points: list, tz: str = "auto", wait: bool = True, count: bool = True) -> list:
+    """Forecasts for many (lat, lon) points through the fetch_forecast_api cache. Misses are
+    fetched FORECAST_BATCH locations per request; stale entries are served and refreshed
+    the same way in the background. Keys already being loaded elsewhere are waited on
+    (misses) or left alone (refreshes), never requested twice. With wait=False misses are
+    None and load in the background too (the overlay, counted as overlay.* rather than
+    forecast demand); count=False leaves the demand counters alone as in `fetch_forecast`."""
+    keys = [("fetch_forecast_api", *map(float, snap_point(lat, lon, FORECAST_SNAP)), tz) for lat, lon in points]
+    soft, hard = CACHE_TTLS["fetch_forecast_api"]
+    cache, found, missing, stale = swr_cache(), {}, [], []
+    for key in dict.fromkeys(keys):
+        hit = cache.peek(key)
+        age = time.time() - hit[0] if hit is not None else None
+        if age is not None and age < hard:
+            found[key] = hit[1]
+            if age >= soft:
+                stale.append(key)
+        else:
+            missing.append(key)
+    if not wait:
+        metrics().inc("overlay.nodes", len(keys))
+        metrics().inc("overlay.nodes_missing", len(missing))
+    elif count and threading.current_thread().name != WARMUP_THREAD:
+        metrics().inc("forecast.calls", len(keys))
+        metrics().inc("forecast.misses", len(missing))
+        metrics().inc("cache.fetch_forecast_api.miss", len(missing))
+
+    def request(chunk: list) -> list:
+        metrics().inc("forecast.batch_requests")
+        return request_forecasts([k[1:3] for k in chunk], tz)
+
+    def fill(owned: dict):
+        batch, size = list(owned.items()), batch_size(FORECAST, FORECAST_BATCH)
+        for i in range(0, len(batch), size):
+            cache.fulfil(dict(batch[i:i + size]), request, hard)
+
+    refreshing, _ = cache.claim(stale)
+    owned, waiting = cache.claim(missing)
+    if not wait:
+        refreshing.update(owned)
+        owned, waiting = {}, {}
+    if refreshing:
+        submit(fill, refreshing, background=True)
+    if waiting:
+        metrics().inc("singleflight.coalesced", len(waiting))
+    fill(owned)
+    for key, fut in {**owned, **waiting}.items():
+        found[key] = fut.result()
+    return [found.get(k) for k in keys]
 
 def format_place(loc: dict) -> str:
     return " · ".join([x for x in [loc.get("name"), loc.get("admin1"), loc.get("country")] if x])
 
-# ---------------- Sidebar (units only) ----------------
+# ---------------- Cache warm-up ----------------
+def hot_locations() -> list:
+    try:
+        return pd.read_csv(HOT_LOCATIONS_PATH)[["latitude", "longitude"]].to_records(index=False).tolist()
+    except (OSError, KeyError):
+        return []
+
+def warm_up():
+    """One warm-up pass over the hot locations and the most requested forecast keys."""
+    def paced(fn, *args):
+        before = metrics().counts["upstream"]
+        try:
+            fn(*args)
+        except Exception:
+            pass
+        time.sleep((metrics().counts["upstream"] - before) / WARMUP_RATE)  # pay only for real requests
+
+    hot = hot_locations()
+    paced(fetch_forecasts, hot)
+    for lat, lon in hot:
+        paced(reverse_geocode, lat, lon)
+        paced(get_timezone, lat, lon)
+    by_tz = {}
+    for _, lat, lon, tz in swr_cache().top("fetch_forecast_api", WARMUP_TOP_N):
+        by_tz.setdefault(tz, []).append((lat, lon))
+    for tz, points in by_tz.items():
+        paced(fetch_forecasts, points, tz)
+    metrics().inc("warmup.passes")
+
+@st.cache_resource(show_spinner=False)
+def warmup_scheduler() -> threading.Thread:
+    """Started once per process: warms at startup, then every WARMUP_INTERVAL seconds."""
+    def loop():
+        while True:
+            with background_priority():
+                warm_up()
+            time.sleep(WARMUP_INTERVAL)
+    t = threading.Thread(target=loop, name=WARMUP_THREAD, daemon=True)
+    add_script_run_ctx(t, get_script_run_ctx())
+    t.start()
+    return t
+
+if WARMUP_INTERVAL > 0:
+    warmup_scheduler()
+
+# ---------------- Grid tiles and map overlay ----------------
+# Tiles only fix the node layout; node values are fetch_forecast_api entries shared with
+# grid-interpolated click forecasts, so they age and refresh with the forecast TTLs.
+def tile_range(south: float, west: float, north: float, east: float):
+    """Tile index ranges (rows, cols) covering a lat/lon box."""
+    south, north = max(south, -80), min(north, 80)  # Web Mercator overlays degenerate near the poles
+    rows = range(int(np.floor(south / TILE_DEG)), int(np.ceil(north / TILE_DEG)))
+    cols = range(int(np.floor(west / TILE_DEG)), int(np.ceil(east / TILE_DEG)))
+    return rows, cols
+
+def grid_mosaic(rows: range, cols: range, var: str):
+    """Current `var` at the node centres of a block of tiles (row 0 = south), from cached
+    forecasts only, and the number of nodes still missing. Missing nodes are NaN and load in
+    the background at background priority; later runs pick them up."""
+    step = TILE_DEG / TILE_NODES
+    lats = rows.start * TILE_DEG + (np.arange(len(rows) * TILE_NODES) + 0.5) * step
+    lons = cols.start * TILE_DEG + (np.arange(len(cols) * TILE_NODES) + 0.5) * step
+    lons = (lons + 180) % 360 - 180  # viewports panned across the antimeridian
+    forecasts = fetch_forecasts([(float(lat), float(lon)) for lat in lats for lon in lons], wait=False)
+    values = [np.nan if f is None else f["current"].get(var) for f in forecasts]
+    grid = np.array(values, dtype=np.float32).reshape(len(lats), len(lons))  # null values → NaN
+    return grid, sum(f is None for f in forecasts)
+
+def interpolated_forecast(lat: float, lon: float, count: bool = True):
+    """Bilinear blend of the forecasts at the four grid nodes around (lat, lon), or None when
+    they straddle timezones, sit in complex terrain, lack current values, lie beyond the
+    outermost node rows near the poles, or cannot be fetched."""
+    step = TILE_DEG / TILE_NODES
+    r, c = lat / step - 0.5, lon / step - 0.5  # fractional node coordinates
+    r0, c0 = np.floor(r), np.floor(c)
+    fr, fc = r - r0, c - c0
+    nodes = [((r0 + i + 0.5) * step, (c0 + j + 0.5) * step) for i in (0, 1) for j in (0, 1)]
+    weights = [(1 - fr) * (1 - fc), (1 - fr) * fc, fr * (1 - fc), fr * fc]
+    forecasts = []
+    if all(abs(a) <= 90 for a, _ in nodes):
+        try:
+            forecasts = fetch_forecasts([(float(a), float((b + 180) % 360 - 180)) for a, b in nodes], count=count)
+        except Exception:
+            pass
+    elevations = [f.get("elevation") for f in forecasts]
+    current = {k: float(sum(w * as_float(f["current"].get(k)) for w, f in zip(weights, forecasts)))
+               for k in CURRENT_VARS}
+    if (not forecasts or len({f["timezone"] for f in forecasts}) > 1 or None in elevations
+            or max(elevations) - min(elevations) > GRID_MAX_RELIEF_M
+            or not all(np.isfinite(v) for v in current.values())  # a node sent null: fetch the point
+            or any(not f["hourly"].index.equals(forecasts[0]["hourly"].index) for f in forecasts)):
+        metrics().inc("forecast.grid_fallback")
+        return None
+    metrics().inc("forecast.grid_interpolated")
+    def blend(frames):
+        return sum(w * df for w, df in zip(weights, frames)).astype(np.float32)
+    return {
+        "timezone": forecasts[0]["timezone"],
+        "elevation": float(sum(w * e for w, e in zip(weights, elevations))),
+        "current": current,
+        "hourly": blend([f["hourly"] for f in forecasts]),
+        "daily": blend([f["daily"] for f in forecasts]),
+    }
+
+# value → RGBA colour ramps
+OVERLAY_RAMPS = {
+    "temperature_2m": ([-20, 0, 10, 20, 30, 40],
+                       [(49, 54, 149), (69, 117, 180), (116, 173, 209), (254, 224, 144), (244, 109, 67), (165, 0, 38)],
+                       [170] * 6),
+    "precipitation": ([0, 0.1, 1, 5, 10], [(255, 255, 255), (198, 219, 239), (107, 174, 214), (33, 113, 181), (8, 48, 107)],
+                      [0, 90, 150, 190, 220]),
+}
+
+def colorize(values: np.ndarray, var: str) -> np.ndarray:
+    stops, colors, alpha = OVERLAY_RAMPS[var]
+    channels = [np.interp(values, stops, [col[k] for col in colors]) for k in range(3)]
+    rgba = np.stack(channels + [np.interp(values, stops, alpha)], axis=-1)
+    rgba[np.isnan(values)] = 0
+    return rgba.astype(np.uint8)
+
+def weather_overlay(bounds: tuple, var: str, upsample: int = 8):
+    """(ImageOverlay of `var` over the tiles covering `bounds` (south, west, north, east),
+    bilinearly interpolated from the cached node grid; its value range; nodes still loading).
+    The overlay is None when the viewport needs too many tiles or no node is cached yet."""
+    rows, cols = tile_range(*bounds)
+    if len(rows) * len(cols) > OVERLAY_MAX_TILES:
+        return None, None, 0
+    grid, pending = grid_mosaic(rows, cols, var)
+    if not np.isfinite(grid).any():
+        return None, None, pending
+    h, w = grid.shape
+    r = (np.arange(h * upsample) + 0.5) / upsample - 0.5
+    c = (np.arange(w * upsample) + 0.5) / upsample - 0.5
+    values = bilinear(grid, r[:, None], c[None, :])
+    image = colorize(values[::-1], var)  # image rows run north → south
+    extent = [[rows.start * TILE_DEG, cols.start * TILE_DEG], [rows.stop * TILE_DEG, cols.stop * TILE_DEG]]
+    overlay = folium.raster_layers.ImageOverlay(image, bounds=extent, mercator_project=True, name=var)
+    return overlay, (float(np.nanmin(grid)), float(np.nanmax(grid))), pending
+
+# ---------------- Sidebar ----------------
+phases = {}  # per-phase durations of this script run
+metrics().inc("script_runs")
+
 st.sidebar.header("Options")
-units = st.sidebar.radio("Units", ["metric (°C, km/h)", "imperial (°F, mph)"], index=0)
-metric = units.startswith("metric")
+stats_box = st.sidebar.container()  # filled at the end of the run, once this run is counted
 if st.sidebar.button("Clear cache"):
-    st.cache_data.clear()
+    swr_cache().clear()
     st.rerun()
+overlay_var = {"None": None, "Temperature": "temperature_2m", "Precipitation": "precipitation"}[
+    st.sidebar.selectbox("Map overlay", ["None", "Temperature", "Precipitation"], index=0)]
+show_timings = st.sidebar.checkbox("Show timings", value=False)
+timings_box = st.sidebar.container()  # filled at the end of the run
 
 # ---------------- State init ----------------
 if "loc" not in st.session_state:
@@ -71,84 +611,265 @@ if "zoom" not in st.session_state:
 st.title("⛅ Weather — Click any place on the map")
 st.caption("点击地图立即显示该城市天气；找不到城市名时显示坐标。")
 
-# ---------------- Map (center/marker uses current state) ----------------
-loc = st.session_state["loc"]
+# ---------------- Handle click: update state, then render it in this same run ----------------
+# The map's last interaction is already in session_state when this run starts, so the new
+# location is applied before the map and forecast are built — no second script run needed.
+# (st_folium copies its value to session_state[key] only since streamlit-folium 0.24.0; before
+# that it lived solely under the hashed component key, hence the pin in requirements.txt.)
+clicked = (st.session_state.get("map") or {}).get("last_clicked")
+if clicked and clicked != st.session_state.get("handled_click"):
+    st.session_state["handled_click"] = clicked
+    lat = float(clicked["lat"])
+    lon = float(clicked["lng"])
 
-m = folium.Map(
-    location=[loc["latitude"], loc["longitude"]],
-    zoom_start=st.session_state["zoom"],
-    tiles="cartodbpositron"
-)
+    # round-trips in flight at once: click latency is max(), not sum()
+    metrics().inc("clicks")
+    t_click = time.perf_counter()
+    cache_hit = swr_cache().lookup(("fetch_forecast_api", *map(float, snap_point(lat, lon, FORECAST_SNAP)), "auto")) is not None
+    metrics().inc(f"clicks.forecast_{'hit' if cache_hit else 'miss'}")
+    f_rev = submit(call_timed, "reverse_geocode", phases, reverse_geocode, lat, lon)
+    f_tz = submit(call_timed, "timezone", phases, get_timezone, lat, lon) if TZ_SOURCE == "api" else None
+    f_fc = submit(call_timed, "forecast.click", phases, fetch_forecast, lat, lon, "auto")  # warms the display below
 
-popup_html = f"<b>{format_place(loc) or 'Selected point'}</b><br>{loc['latitude']:.4f}, {loc['longitude']:.4f}"
-marker = folium.Marker(
-    [loc["latitude"], loc["longitude"]],
-    tooltip=f"{format_place(loc) or 'Selected point'}",
-    popup=folium.Popup(popup_html, max_width=260, show=True),
-    icon=folium.Icon(color="blue"),
-)
-marker.add_to(m)
-
-out = st_folium(m, height=480, use_container_width=True)
-
-# ---------------- Handle click: update state THEN rerun immediately ----------------
-if out and out.get("last_clicked"):
-    lat = float(out["last_clicked"]["lat"])
-    lon = float(out["last_clicked"]["lng"])
-
-    rev = reverse_geocode(lat, lon)
+    rev = f_rev.result()
+    tz = (rev or {}).get("timezone") or get_timezone_offline(lat, lon)
+    if not tz:
+        if f_tz is not None:
+            tz = f_tz.result()
+        elif f_fc.exception() is None:  # the forecast echoes the zone resolved for timezone=auto
+            tz = f_fc.result().get("timezone", "auto")
+        else:
+            tz = "auto"
     if rev:
-        tz = rev.get("timezone") or get_timezone(lat, lon)
         name = rev.get("name") or rev.get("admin1") or "Selected point"
         admin1 = rev.get("admin1")
         country = rev.get("country")
     else:
-        tz = get_timezone(lat, lon)
         name = f"Selected point ({lat:.2f}, {lon:.2f})"
         admin1, country = None, None
+    f_fc.exception()  # wait for the forecast; a failure is retried and reported below
+    phases["click"] = time.perf_counter() - t_click
+    metrics().observe("click", phases["click"])
+    log.info("click %.4f,%.4f forecast_cache=%s %s", lat, lon, "hit" if cache_hit else "miss",
+             " ".join(f"{k}={v * 1000:.0f}ms" for k, v in phases.items()))
 
     st.session_state["loc"] = {
         "name": name, "admin1": admin1, "country": country,
         "latitude": lat, "longitude": lon, "timezone": tz
     }
     st.session_state["zoom"] = 10  # zoom 到城市级
-    st.rerun()                    # ← 新版 API：立即重绘
+    st.session_state["counted_loc"] = (lat, lon)  # the panel below re-reads this forecast uncounted
+    phases["forecast_cache_hit"] = cache_hit
+    metrics().inc("reruns.click")
+else:
+    metrics().inc("reruns.other")  # first load, sidebar widgets, or a map event that was not a new click
 
-# ---------------- Weather display ----------------
+# ---------------- Map (base built once per session; marker/center/zoom pushed as updates) ----------------
 loc = st.session_state["loc"]
-st.markdown(f"### {format_place(loc) or 'Selected point'}")
 
+t_map = time.perf_counter()
+if "base_map" not in st.session_state:
+    # tiles-only skeleton: its leaflet script never changes, so st_folium keeps the same
+    # component mounted and the browser never re-initializes the map
+    base_map = folium.Map(
+        location=[loc["latitude"], loc["longitude"]],
+        zoom_start=st.session_state["zoom"],
+        tiles="cartodbpositron"
+    )
+    base_map.render()
+    generate_leaflet_string(base_map)  # st_folium renames element ids on first use; do it now, not on run 2
+    st.session_state["base_map"] = base_map
+
+popup_html = f"<b>{format_place(loc) or 'Selected point'}</b><br>{loc['latitude']:.4f}, {loc['longitude']:.4f}"
+selection = folium.FeatureGroup(name="selection")
+folium.Marker(
+    [loc["latitude"], loc["longitude"]],
+    tooltip=f"{format_place(loc) or 'Selected point'}",
+    popup=folium.Popup(popup_html, max_width=260, show=True),
+    icon=folium.Icon(color="blue"),
+).add_to(selection)
+
+overlay_range, overlay_note, overlay_pending = None, None, 0
+if overlay_var:
+    vb = (st.session_state.get("map") or {}).get("bounds") or {}
+    sw, ne = vb.get("_southWest") or {}, vb.get("_northEast") or {}
+    if sw.get("lat") is not None and ne.get("lat") is not None:
+        bounds = (sw["lat"], sw["lng"], ne["lat"], ne["lng"])
+    else:  # before the first viewport report
+        bounds = (loc["latitude"] - 6, loc["longitude"] - 8, loc["latitude"] + 6, loc["longitude"] + 8)
+    try:
+        with timed("overlay", phases):
+            overlay, overlay_range, overlay_pending = weather_overlay(bounds, overlay_var)
+        if overlay is not None:
+            overlay.add_to(selection)
+        elif overlay_pending:
+            overlay_note = "Loading the weather overlay; it fills in as you pan or click."
+        else:
+            overlay_note = "Zoom in to see the weather overlay."
+    except Exception:
+        overlay_range = None
+
+# only clicks (and the viewport, while an overlay is shown) come back to the server
 try:
-    data = fetch_forecast(loc["latitude"], loc["longitude"], loc.get("timezone","auto"), metric)
-except Exception:
-    st.error("Fetching forecast failed. Please click another point or try again.")
-    st.stop()
-
-cur, hourly, daily = data.get("current", {}), data.get("hourly", {}), data.get("daily", {})
-
-c1, c2, c3, c4 = st.columns(4)
-c1.metric("Temperature", f"{cur.get('temperature_2m','–')}°")
-c2.metric("Feels like", f"{cur.get('apparent_temperature','–')}°")
-c3.metric("Wind", f"{cur.get('wind_speed_10m','–')} {'km/h' if metric else 'mph'}")
-c4.metric("Humidity", f"{cur.get('relative_humidity_2m','–')}%")
-
-st.markdown("#### Next 24 hours")
-h_temp = (hourly.get("temperature_2m") or [])[:24]
-h_prec = (hourly.get("precipitation") or [])[:24]
-h_wind = (hourly.get("wind_speed_10m") or [])[:24]
-if h_temp: st.line_chart({"temperature": h_temp}, height=180)
-if h_prec: st.bar_chart({"precipitation": h_prec}, height=120)
-if h_wind: st.line_chart({"wind": h_wind}, height=120)
-
-st.markdown("#### 7-day forecast")
-df = pd.DataFrame({
-    "date": daily.get("time", []),
-    "max °": daily.get("temperature_2m_max", []),
-    "min °": daily.get("temperature_2m_min", []),
-    "precip mm": daily.get("precipitation_sum", []),
-    "wind max": daily.get("wind_speed_10m_max", []),
-})
-if not df.empty:
-    st.dataframe(df, use_container_width=True, hide_index=True)
+    st_folium(
+        st.session_state["base_map"], key="map", height=480, use_container_width=True,
+        returned_objects=["last_clicked", "bounds"] if overlay_var else ["last_clicked"],
+        center=(loc["latitude"], loc["longitude"]), zoom=st.session_state["zoom"],
+        feature_group_to_add=selection,
+    )
+finally:
+    # st_folium adds the group to the map it renders; left there, the next run would bake this
+    # marker (and overlay) into the base script and change the component key
+    st.session_state["base_map"]._children.pop(selection.get_name(), None)
+phases["map"] = time.perf_counter() - t_map
+metrics().observe("map", phases["map"])
+if overlay_var:
+    st.caption(f"Overlay {overlay_range[0]:.1f}–{overlay_range[1]:.1f} {'°C' if overlay_var == 'temperature_2m' else 'mm'}"
+               + (f" · {overlay_pending} grid points still loading" if overlay_pending else "")
+               if overlay_range else overlay_note or "Weather overlay unavailable right now.")
+
+# ---------------- Comparison of pinned locations ----------------
+MAX_PINS = 50
+
+def pin_key(loc: dict) -> tuple:
+    return round(loc["latitude"], 4), round(loc["longitude"], 4)
+
+def toggle_pin(loc: dict):
+    """Button callback: runs before the (fragment or full) rerun, so the panel renders the new state."""
+    pins = st.session_state.get("pins", [])
+    if any(pin_key(p) == pin_key(loc) for p in pins):
+        st.session_state["pins"] = [p for p in pins if pin_key(p) != pin_key(loc)]
+    else:
+        st.session_state["pins"] = pins + [loc]
+
+def compare_view(metric: bool):
+    """Current conditions and 7-day extremes for every pinned location, from one batched fetch."""
+    pins = st.session_state.get("pins", [])
+    if not pins:
+        return
+    st.markdown(f"#### Pinned locations ({len(pins)})")
+    points = [(p["latitude"], p["longitude"]) for p in pins]
+    count = st.session_state.get("counted_pins") != points  # demand only when the pins change
+    st.session_state["counted_pins"] = points
+    try:
+        with timed("compare.forecast", phases):
+            forecasts = fetch_forecasts(points, count=count)
+    except Exception:
+        st.error("Fetching forecasts for pinned locations failed.")
+        return
+
+    t_render = time.perf_counter()
+    # numbered by pin position, so places sharing a name still get distinct columns and chart series
+    labels = [f"{i + 1}. " + (format_place(p) or f"{p['latitude']:.2f}, {p['longitude']:.2f}")
+              for i, p in enumerate(pins)]
+    def current(var):
+        return np.array([f["current"].get(var, np.nan) for f in forecasts], dtype=float)
+    # (days × locations) frames aligned on each location's local dates, one column per pin index
+    pin_ids = range(len(forecasts))
+    day_max = pd.concat([f["daily"]["temperature_2m_max"] for f in forecasts], axis=1, keys=pin_ids, sort=True)
+    day_min = pd.concat([f["daily"]["temperature_2m_min"] for f in forecasts], axis=1, keys=pin_ids, sort=True)
+    table = pd.DataFrame({
+        "location": labels,
+        "temp °": convert(current("temperature_2m"), "temp", metric),
+        "feels °": convert(current("apparent_temperature"), "temp", metric),
+        "wind": convert(current("wind_speed_10m"), "wind", metric),
+        "humidity %": current("relative_humidity_2m"),
+        "7-day max °": convert(day_max.max().to_numpy(), "temp", metric),
+        "7-day min °": convert(day_min.min().to_numpy(), "temp", metric),
+    })
+    st.dataframe(table.round(1), use_container_width=True, hide_index=True)
+    st.line_chart(pd.DataFrame(convert(day_max.to_numpy(), "temp", metric), index=day_max.index, columns=labels),
+                  height=260)
+    st.button("Clear pins", on_click=st.session_state.__setitem__, args=("pins", []))
+    metrics().observe("compare.render", time.perf_counter() - t_render)
+
+# ---------------- Weather display (fragment: Units changes rerun only this panel) ----------------
+@st.fragment
+def weather_panel(loc: dict):
+    if not st.session_state.pop("panel_in_script_run", False):
+        metrics().inc("reruns.panel")  # fragment-only rerun: Units or Pin
+    units = st.radio("Units", ["metric (°C, km/h)", "imperial (°F, mph)"], index=0, horizontal=True, key="units")
+    metric = units.startswith("metric")
+    head, pin = st.columns([5, 1])
+    head.markdown(f"### {format_place(loc) or 'Selected point'}")
+    pins = st.session_state.setdefault("pins", [])
+    pinned = any(pin_key(p) == pin_key(loc) for p in pins)
+    pin.button("Unpin" if pinned else "📌 Pin", disabled=not pinned and len(pins) >= MAX_PINS,
+               on_click=toggle_pin, args=(dict(loc),))
+
+    try:
+        # "auto" lets Open-Meteo resolve the zone itself, so this shares the cache entry warmed on click;
+        # it counts as demand only on the first load, clicks having counted their own fetch
+        point = (loc["latitude"], loc["longitude"])
+        count = st.session_state.get("counted_loc") != point
+        st.session_state["counted_loc"] = point
+        with timed("forecast", phases):
+            data = fetch_forecast(*point, "auto", count)
+    except Exception:
+        st.error("Fetching forecast failed. Please click another point or try again.")
+        return
+
+    cur, hourly, daily = data["current"], data["hourly"], data["daily"]
+    t_render = time.perf_counter()
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Temperature", f"{fmt(convert(cur.get('temperature_2m'), 'temp', metric))}°")
+    c2.metric("Feels like", f"{fmt(convert(cur.get('apparent_temperature'), 'temp', metric))}°")
+    c3.metric("Wind", f"{fmt(convert(cur.get('wind_speed_10m'), 'wind', metric))} {'km/h' if metric else 'mph'}")
+    c4.metric("Humidity", f"{fmt(cur.get('relative_humidity_2m'), 0)}%")
+
+    st.markdown("#### Next 24 hours")
+    next24 = hourly.iloc[:24]
+    if not next24.empty:
+        st.line_chart(pd.DataFrame({"temperature": convert(next24["temperature_2m"], "temp", metric)},
+                                   index=next24.index), height=180)
+        st.bar_chart(next24[["precipitation"]], height=120)
+        st.line_chart(pd.DataFrame({"wind": convert(next24["wind_speed_10m"], "wind", metric)},
+                                   index=next24.index), height=120)
+
+    st.markdown("#### 7-day forecast")
+    df = pd.DataFrame({
+        "date": daily.index.strftime("%Y-%m-%d"),
+        "max °": convert(daily["temperature_2m_max"], "temp", metric),
+        "min °": convert(daily["temperature_2m_min"], "temp", metric),
+        "precip mm": daily["precipitation_sum"].to_numpy(),
+        "wind max": convert(daily["wind_speed_10m_max"], "wind", metric),
+    })
+    if not df.empty:
+        st.dataframe(df, use_container_width=True, hide_index=True)
+
+    phases["render"] = time.perf_counter() - t_render
+    metrics().observe("render", phases["render"])
+
+    compare_view(metric)
+
+st.session_state["panel_in_script_run"] = True
+weather_panel(st.session_state["loc"])
 
 st.caption("Data: © Open-Meteo.com • No API key required.")
+
+with stats_box:
+    _m = metrics().counts
+    if _m["clicks"]:
+        st.caption(f"Upstream requests per click: {_m['upstream.interactive'] / _m['clicks']:.2f}")
+        st.caption(f"Script runs: {_m['script_runs']} for {_m['clicks']} clicks")
+    if _m["script_runs"]:
+        st.caption(f"Reruns — click: {_m['reruns.click']}, panel: {_m['reruns.panel']}, other: {_m['reruns.other']}")
+    if _m["forecast.calls"]:
+        st.caption(f"Forecast cache hit rate: {1 - _m['forecast.misses'] / _m['forecast.calls']:.0%}")
+    if _m["singleflight.issued"]:
+        st.caption(f"Coalesced fetches: {_m['singleflight.coalesced']} (issued {_m['singleflight.issued']})")
+    _resident = swr_cache().stats()
+    if _resident:
+        st.caption(f"Cached in memory: {sum(n for n, _ in _resident.values())} entries, "
+                   f"{sum(b for _, b in _resident.values()) / 2**20:.1f} MB")
+
+if show_timings:
+    with timings_box:
+        st.dataframe(pd.DataFrame(
+            [(k, round(v * 1000, 1)) for k, v in phases.items() if isinstance(v, float)], columns=["phase", "ms"],
+        ), hide_index=True, use_container_width=True)
+        if "forecast_cache_hit" in phases:
+            st.caption(f"Last click forecast cache: {'hit' if phases['forecast_cache_hit'] else 'miss'}")
+        with st.expander("Prometheus metrics"):
+            st.code(metrics().prometheus(), language="text")
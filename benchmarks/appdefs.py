@@ -0,0 +1,25 @@
+# Loads app.py's definitions (everything above its page code) without rendering the page, so the
+# measurement scripts can call the app's own helpers. Streamlit runs in bare mode: cache_resource
+# still memoizes per process and page elements are no-ops.
+import logging
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+PAGE_MARKER = "# ---------------- Sidebar ----------------"
+
+def load(**settings) -> dict:
+    """app.py's module namespace, with WEATHER_<NAME> environment `settings` applied first
+    (e.g. RATE_DB="" disables rate limiting). The warm-up job stays off unless set."""
+    os.environ.setdefault("WEATHER_WARMUP_INTERVAL", "0")
+    for name, value in settings.items():
+        os.environ[f"WEATHER_{name}"] = str(value)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    logging.disable(logging.WARNING)  # bare-mode "missing ScriptRunContext" warnings
+    with open(APP, encoding="utf-8") as f:
+        source = f.read()
+    ns = {"__file__": APP, "__name__": "app"}
+    exec(compile(source[:source.index(PAGE_MARKER)], APP, "exec"), ns)
+    return ns
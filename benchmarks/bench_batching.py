@@ -0,0 +1,42 @@
+# Upstream requests and wall time to load forecasts for 10/100/1000 uncached locations: batched
+# through fetch_forecasts (FORECAST_BATCH locations per request, counted as forecast.batch_requests)
+# vs one fetch_forecast_api call per location on the shared I/O pool. The upstream is stubbed
+# with a fixed round trip plus a per-location cost, rate limiting and the disk cache are off.
+#
+#   python benchmarks/bench_batching.py [--latency-ms 80] [--per-location-ms 0.5]
+import argparse
+import time
+
+import appdefs
+from stub_upstream import StubUpstream
+
+def points(n: int) -> list:
+    """`n` locations 0.5° apart: each in its own snap cell."""
+    return [(40 + (i // 40) * 0.5, -10 + (i % 40) * 0.5) for i in range(n)]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--latency-ms", type=float, default=80)
+    ap.add_argument("--per-location-ms", type=float, default=0.5)
+    args = ap.parse_args()
+    app = appdefs.load(RATE_DB="", CACHE_DB="")
+    counts = app["metrics"]().counts
+    print(f"{'locations':>9} {'mode':<13} {'requests':>8} {'batch_requests':>14} {'wall s':>7}")
+    with StubUpstream(args.latency_ms / 1000, args.per_location_ms / 1000) as upstream:
+        for n in (10, 100, 1000):
+            for mode in ("batched", "per-location"):
+                app["swr_cache"]().clear()
+                requests, batches = upstream.requests, counts["forecast.batch_requests"]
+                t0 = time.perf_counter()
+                if mode == "batched":
+                    forecasts = app["fetch_forecasts"](points(n))
+                else:
+                    futures = [app["submit"](app["fetch_forecast_api"], lat, lon, "auto") for lat, lon in points(n)]
+                    forecasts = [f.result() for f in futures]
+                wall = time.perf_counter() - t0
+                assert all(f is not None for f in forecasts)
+                print(f"{n:>9} {mode:<13} {upstream.requests - requests:>8} "
+                      f"{counts['forecast.batch_requests'] - batches:>14} {wall:>7.2f}")
+
+if __name__ == "__main__":
+    main()
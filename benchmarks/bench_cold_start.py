@@ -0,0 +1,61 @@
+# First-request latency after a restart, with an empty disk cache (cold) vs one a previous process
+# filled (warm). Each run is a fresh Python process, so the in-memory tier always starts empty; a
+# "request" is the page's click path (reverse_geocode, get_timezone, fetch_forecast) for the first
+# hot locations, against a stubbed upstream.
+#
+#   python benchmarks/bench_cold_start.py [--runs 3] [--locations 1] [--latency-ms 80]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+def child(db: str, locations: int, latency: float):
+    """One process start: prints load time (including the offline indexes), first-request and remaining-request latency, upstream calls."""
+    t0 = time.perf_counter()
+    import appdefs
+    from stub_upstream import StubUpstream
+    app = appdefs.load(RATE_DB="", CACHE_DB=db)
+    for resource in ("swr_cache", "city_index", "timezone_grid"):  # process-wide, whatever the disk cache holds
+        app[resource]()
+    loaded = time.perf_counter() - t0
+    times = []
+    with StubUpstream(latency) as upstream:
+        for lat, lon in app["hot_locations"]()[:locations]:
+            t0 = time.perf_counter()
+            app["reverse_geocode"](lat, lon)
+            app["fetch_forecast"](lat, lon, app["get_timezone"](lat, lon))
+            times.append(time.perf_counter() - t0)
+    print(json.dumps({"load": loaded, "first": times[0], "rest": sum(times[1:]), "upstream": upstream.requests}))
+
+def start(db: str, args) -> dict:
+    out = subprocess.run([sys.executable, __file__, "--child", db, "--locations", str(args.locations),
+                          "--latency-ms", str(args.latency_ms)], check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.splitlines()[-1])
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--locations", type=int, default=1, help="hot locations requested after start")
+    ap.add_argument("--latency-ms", type=float, default=80)
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child is not None:
+        return child(args.child, args.locations, args.latency_ms / 1000)
+    results = {"cold": [], "warm": []}
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as workdir:
+            db = os.path.join(workdir, "cache.sqlite")
+            results["cold"].append(start(db, args))  # fills db
+            results["warm"].append(start(db, args))
+    print(f"{'start':<6} {'load s':>7} {'first request ms':>17} {'rest ms':>8} {'upstream':>8}")
+    for name, runs in results.items():
+        med = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+        print(f"{name:<6} {med['load']:>7.2f} {med['first'] * 1000:>17.1f} {med['rest'] * 1000:>8.1f} "
+              f"{med['upstream']:>8.0f}")
+
+if __name__ == "__main__":
+    main()
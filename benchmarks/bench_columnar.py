@@ -0,0 +1,88 @@
+# Memory and CPU of a cached forecast in the columnar form (parse_forecast: float32 DataFrames on a
+# DatetimeIndex) vs the raw JSON dict the app cached before. Memory is the live heap of one entry
+# (tracemalloc), its pickled size (what the in-memory tier budgets) and its compressed disk row.
+# CPU is the decode on a miss and the per-rerun preparation of the 24-hour charts and 7-day table
+# from the cached entry, each path with the display code it had. The columnar form keeps only the
+# app's variables, so the multi-variable payload shows what caching everything returned costs.
+#
+#   python benchmarks/bench_columnar.py [--repeat 200]
+import argparse
+import os
+import pickle
+import sys
+import tracemalloc
+import zlib
+
+import pandas as pd
+
+import record_payloads
+from bench_json_decode import best_ms
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forecast import convert, parse_forecast  # noqa: E402
+
+try:  # the decoder app.py uses
+    from orjson import loads as json_loads
+except ImportError:
+    import json
+    json_loads = json.loads
+
+def render_dict(data: dict, metric: bool = False) -> tuple:
+    """Chart and table inputs from the raw dict: list slices and a DataFrame built from lists."""
+    hourly, daily = data.get("hourly", {}), data.get("daily", {})
+    charts = (convert((hourly.get("temperature_2m") or [])[:24], "temp", metric),
+              (hourly.get("precipitation") or [])[:24],
+              convert((hourly.get("wind_speed_10m") or [])[:24], "wind", metric))
+    table = pd.DataFrame({
+        "date": daily.get("time", []),
+        "max °": convert(daily.get("temperature_2m_max", []), "temp", metric),
+        "min °": convert(daily.get("temperature_2m_min", []), "temp", metric),
+        "precip mm": daily.get("precipitation_sum", []),
+        "wind max": convert(daily.get("wind_speed_10m_max", []), "wind", metric),
+    })
+    return charts, table
+
+def render_columnar(data: dict, metric: bool = False) -> tuple:
+    """Chart and table inputs from the cached columns, as weather_panel builds them."""
+    hourly, daily = data["hourly"], data["daily"]
+    next24 = hourly.iloc[:24]
+    charts = (pd.DataFrame({"temperature": convert(next24["temperature_2m"], "temp", metric)}, index=next24.index),
+              next24[["precipitation"]],
+              pd.DataFrame({"wind": convert(next24["wind_speed_10m"], "wind", metric)}, index=next24.index))
+    table = pd.DataFrame({
+        "date": daily.index.strftime("%Y-%m-%d"),
+        "max °": convert(daily["temperature_2m_max"], "temp", metric),
+        "min °": convert(daily["temperature_2m_min"], "temp", metric),
+        "precip mm": daily["precipitation_sum"].to_numpy(),
+        "wind max": convert(daily["wind_speed_10m_max"], "wind", metric),
+    })
+    return charts, table
+
+def live_kb(build) -> float:
+    """Heap still held by the object `build()` returns, in KB."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del value
+    return size / 1024
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+    print(f"{'payload':<11} {'form':<9} {'heap KB':>8} {'pickle KB':>9} {'disk KB':>8} {'decode ms':>9} {'render ms':>9}")
+    for name in (n for n in record_payloads.names() if n.endswith("_1")):  # one cache entry per location
+        body = record_payloads.load(name, "json")
+        forms = {"dict": (lambda: json_loads(body), render_dict),
+                 "columnar": (lambda: parse_forecast(json_loads(body)), render_columnar)}
+        for form, (decode, render) in forms.items():
+            value = decode()
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            print(f"{name:<11} {form:<9} {live_kb(decode):>8.1f} {len(blob) / 1024:>9.1f} "
+                  f"{len(zlib.compress(blob)) / 1024:>8.1f} {best_ms(decode, args.repeat):>9.3f} "
+                  f"{best_ms(lambda: render(value), args.repeat):>9.3f}")
+
+if __name__ == "__main__":
+    main()
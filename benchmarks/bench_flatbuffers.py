@@ -0,0 +1,42 @@
+# Payload size and parse time of the recorded forecast bodies, FlatBuffers vs JSON, through the
+# app's two paths: json_loads + parse_forecast, and flatbuffers_messages + parse_forecast_flatbuffers.
+# Sizes are raw and gzip-compressed (the API sends gzip when asked, as the app does).
+#
+#   python benchmarks/bench_flatbuffers.py [--repeat 100]
+import argparse
+import gzip
+import json
+import os
+import sys
+
+import record_payloads
+from bench_json_decode import best_ms
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forecast import flatbuffers_messages, parse_forecast, parse_forecast_flatbuffers  # noqa: E402
+
+try:  # the decoder app.py uses
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+def parse_json(body: bytes) -> list:
+    payload = json_loads(body)
+    return [parse_forecast(p) for p in (payload if isinstance(payload, list) else [payload])]
+
+def parse_fb(body: bytes) -> list:
+    return [parse_forecast_flatbuffers(m) for m in flatbuffers_messages(body)]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=100)
+    args = ap.parse_args()
+    print(f"{'payload':<14} {'json KB':>8} {'gz':>6} {'fb KB':>7} {'gz':>6} {'json ms':>8} {'fb ms':>7} {'speedup':>8}")
+    for name in record_payloads.names():
+        js, fb = record_payloads.load(name, "json"), record_payloads.load(name, "fb")
+        t_js, t_fb = best_ms(lambda: parse_json(js), args.repeat), best_ms(lambda: parse_fb(fb), args.repeat)
+        print(f"{name:<14} {len(js) / 1024:>8.1f} {len(gzip.compress(js)) / 1024:>6.1f} "
+              f"{len(fb) / 1024:>7.1f} {len(gzip.compress(fb)) / 1024:>6.1f} {t_js:>8.3f} {t_fb:>7.3f} {t_js / t_fb:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# Reverse-geocoding throughput: the offline nearest-city index (reverse_geocode_offline; a KD-tree
+# with scipy, else a NumPy scan) vs the API path (reverse_geocode_api, each point uncached) against a
+# stubbed upstream, sequentially and on the shared I/O pool. Query points are bundled cities
+# jittered by up to ~10 km, so the offline index answers them.
+#
+#   python benchmarks/bench_geocoder.py [--queries 2000] [--latency-ms 80]
+import argparse
+import time
+
+import numpy as np
+
+import appdefs
+from stub_upstream import StubUpstream
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=2000, help="offline lookups")
+    ap.add_argument("--api-queries", type=int, default=100, help="API lookups per mode")
+    ap.add_argument("--latency-ms", type=float, default=80)
+    args = ap.parse_args()
+    app = appdefs.load(RATE_DB="", CACHE_DB="")
+    t0 = time.perf_counter()
+    idx = app["city_index"]()
+    build = time.perf_counter() - t0
+    rng = np.random.default_rng(0)
+    cities = rng.choice(len(idx.records), max(args.queries, args.api_queries))
+    points = [(idx.records[i]["latitude"] + dlat, idx.records[i]["longitude"] + dlon)
+              for i, (dlat, dlon) in zip(cities, rng.uniform(-0.07, 0.07, (len(cities), 2)))]
+    print(f"{len(idx.records)} cities, {'KD-tree' if idx.tree is not None else 'NumPy scan'}, "
+          f"index built in {build:.2f} s")
+    print(f"{'path':<22} {'queries':>7} {'answered':>8} {'q/s':>9} {'ms/query':>9}")
+
+    def report(name, n, answered, wall):
+        print(f"{name:<22} {n:>7} {answered:>8} {n / wall:>9.0f} {wall / n * 1000:>9.3f}")
+
+    t0 = time.perf_counter()
+    answered = sum(app["reverse_geocode_offline"](lat, lon) is not None for lat, lon in points[:args.queries])
+    report("offline", args.queries, answered, time.perf_counter() - t0)
+    api = points[:args.api_queries]
+    with StubUpstream(args.latency_ms / 1000):
+        app["swr_cache"]().clear()
+        t0 = time.perf_counter()
+        answered = sum(app["reverse_geocode_api"](lat, lon) is not None for lat, lon in api)
+        report("api, sequential", len(api), answered, time.perf_counter() - t0)
+        app["swr_cache"]().clear()
+        t0 = time.perf_counter()
+        futures = [app["submit"](app["reverse_geocode_api"], lat, lon) for lat, lon in api]
+        answered = sum(f.result() is not None for f in futures)
+        report("api, I/O pool", len(api), answered, time.perf_counter() - t0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Per-call latency and TLS handshakes with 1/8/32 concurrent sessions: a new connection per call
+# (requests.get, as before pooling) vs the app's pooled keep-alive session (http_session).
+#
+#   python benchmarks/bench_handshake.py [--calls 20] [--rtt-ms 0]
+#   python benchmarks/bench_handshake.py --url https://api.open-meteo.com/v1/forecast?latitude=0&longitude=0
+#
+# By default the target is a local HTTPS server with a throwaway self-signed certificate (made with
+# the openssl CLI) that counts handshakes; --rtt-ms delays each new connection by two round trips
+# (TCP + TLS 1.3) and each request by one, to model a remote host.
+import argparse
+import os
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import requests
+
+import appdefs
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        time.sleep(self.server.rtt)
+        body = b'{"timezone":"UTC"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TLSServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, context: ssl.SSLContext, rtt: float):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.context, self.rtt = context, rtt
+        self.handshakes = 0
+        self._lock = threading.Lock()
+
+    def finish_request(self, request, client_address):
+        time.sleep(2 * self.rtt)
+        conn = self.context.wrap_socket(request, server_side=True)  # the handshake, in this connection's thread
+        with self._lock:
+            self.handshakes += 1
+        self.RequestHandlerClass(conn, client_address, self)
+
+    def handle_error(self, request, client_address):
+        pass  # clients dropping idle keep-alive connections
+
+def local_server(rtt: float, workdir: str) -> TLSServer:
+    cert, key = os.path.join(workdir, "cert.pem"), os.path.join(workdir, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=127.0.0.1",
+                    "-addext", "subjectAltName=IP:127.0.0.1", "-keyout", key, "-out", cert],
+                   check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    os.environ["REQUESTS_CA_BUNDLE"] = cert  # both clients verify against the throwaway certificate
+    server = TLSServer(context, rtt)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run(get, url: str, sessions: int, calls: int) -> list:
+    """Per-call latencies (s) of `sessions` threads each making `calls` sequential GETs."""
+    def session():
+        latencies = []
+        for _ in range(calls):
+            t0 = time.perf_counter()
+            get(url, timeout=10).raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+        return latencies
+    with ThreadPoolExecutor(sessions) as pool:
+        return [t for result in pool.map(lambda _: session(), range(sessions)) for t in result]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=20, help="sequential calls per session")
+    ap.add_argument("--rtt-ms", type=float, default=0, help="simulated round trip of the local server")
+    ap.add_argument("--url", help="measure a real endpoint instead of the local server")
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        server = None if args.url else local_server(args.rtt_ms / 1000, workdir)
+        url = args.url or f"https://127.0.0.1:{server.server_address[1]}/v1/timezone"
+        app = appdefs.load(RATE_DB="", CACHE_DB="")
+        pooled = app["http_session"](urlsplit(url).netloc)
+        print(f"{'sessions':>8} {'client':<15} {'p50 ms':>7} {'p95 ms':>7} {'handshakes':>10} {'calls':>6}")
+        for sessions in (1, 8, 32):
+            for name, get in (("new connection", requests.get), ("pooled", pooled.get)):
+                before = server.handshakes if server else 0
+                latencies = sorted(run(get, url, sessions, args.calls))
+                p95 = latencies[int(0.95 * (len(latencies) - 1))]
+                handshakes = server.handshakes - before if server else "–"
+                print(f"{sessions:>8} {name:<15} {statistics.median(latencies) * 1000:>7.2f} {p95 * 1000:>7.2f} "
+                      f"{handshakes:>10} {len(latencies):>6}")
+        if server:
+            server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# Decoding time of the recorded forecast bodies with orjson vs the stdlib json module (app.py's
+# json_loads is orjson when installed), and the parse_forecast step that follows in the app.
+#
+#   python benchmarks/bench_json_decode.py [--repeat 200]
+import argparse
+import json
+import os
+import sys
+import timeit
+
+import record_payloads
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forecast import parse_forecast  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def best_ms(fn, repeat: int) -> float:
+    """Best of `repeat` timings of one call, in ms (the least disturbed run)."""
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+    if orjson is None:
+        print("orjson is not installed: pip install orjson")
+    print(f"{'payload':<14} {'KB':>7} {'json ms':>9} {'orjson ms':>10} {'speedup':>8} {'parse ms':>9}")
+    for name in record_payloads.names():
+        body = record_payloads.load(name, "json")
+        std = best_ms(lambda: json.loads(body), args.repeat)
+        fast = best_ms(lambda: orjson.loads(body), args.repeat) if orjson else float("nan")
+        payload = json.loads(body)
+        payloads = payload if isinstance(payload, list) else [payload]
+        parse = best_ms(lambda: [parse_forecast(p) for p in payloads], max(1, args.repeat // 4))
+        print(f"{name:<14} {len(body) / 1024:>7.1f} {std:>9.3f} {fast:>10.3f} {std / fast:>7.1f}x {parse:>9.3f}")
+
+if __name__ == "__main__":
+    main()
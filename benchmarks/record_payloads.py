@@ -0,0 +1,255 @@
+# Records the Open-Meteo forecast responses the benchmarks decode: the app's request (7 days),
+# the same over 16 days, and a multi-variable request (14 hourly variables), each for 1 and 10
+# locations, as JSON and as FlatBuffers (format=flatbuffers).
+#
+#   python benchmarks/record_payloads.py            # from api.open-meteo.com
+#   python benchmarks/record_payloads.py --offline  # generated in the API's response layouts
+#
+# Bodies are stored gzip-compressed as benchmarks/payloads/<shape>_<locations>.<json|fb>.gz;
+# --test-fixture also writes the 2-location 7-day pair to tests/fixtures/forecast_7d_2.<json|fb>.
+import argparse
+import calendar
+import gzip
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forecast import CURRENT_VARS, DAILY_VARS, HOURLY_VARS  # noqa: E402
+
+FORECAST = "https://api.open-meteo.com/v1/forecast"
+PAYLOADS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads")
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "fixtures")
+
+EXTRA_HOURLY = ["relative_humidity_2m", "dew_point_2m", "apparent_temperature", "precipitation_probability",
+                "weather_code", "pressure_msl", "cloud_cover", "visibility", "wind_direction_10m",
+                "wind_gusts_10m", "uv_index"]
+SHAPES = {  # name -> (forecast_days, hourly variables)
+    "7d": (7, HOURLY_VARS),
+    "16d": (16, HOURLY_VARS),
+    "multivar": (7, HOURLY_VARS + EXTRA_HOURLY),
+}
+LOCATION_COUNTS = (1, 10)
+
+# (lat, lon, timezone, abbreviation, UTC offset s, elevation m) as Open-Meteo resolves them in October
+LOCATIONS = [
+    (48.86, 2.3399997, "Europe/Paris", "CEST", 7200, 43.0),
+    (52.52, 13.419998, "Europe/Berlin", "CEST", 7200, 38.0),
+    (40.4, -3.7000008, "Europe/Madrid", "CEST", 7200, 657.0),
+    (51.5, -0.12000036, "Europe/London", "BST", 3600, 23.0),
+    (41.9, 12.5, "Europe/Rome", "CEST", 7200, 41.0),
+    (59.34, 18.06, "Europe/Stockholm", "CEST", 7200, 17.0),
+    (35.7, 139.69, "Asia/Tokyo", "JST", 32400, 40.0),
+    (37.559998, 126.97998, "Asia/Seoul", "KST", 32400, 38.0),
+    (-33.86, 151.2, "Australia/Sydney", "AEDT", 39600, 58.0),
+    (40.71, -74.0, "America/New_York", "EDT", -14400, 32.0),
+]
+
+UNITS = {
+    "temperature_2m": "°C", "apparent_temperature": "°C", "dew_point_2m": "°C", "relative_humidity_2m": "%",
+    "wind_speed_10m": "km/h", "wind_gusts_10m": "km/h", "wind_direction_10m": "°", "precipitation": "mm",
+    "precipitation_probability": "%", "weather_code": "wmo code", "pressure_msl": "hPa", "cloud_cover": "%",
+    "visibility": "m", "uv_index": "", "temperature_2m_max": "°C", "temperature_2m_min": "°C",
+    "precipitation_sum": "mm", "wind_speed_10m_max": "km/h",
+}
+
+# FlatBuffers encoding: variable name -> (openmeteo_sdk Variable, altitude, Unit); daily names add
+# an Aggregation suffix (_max, _min, _sum)
+FB_VARIABLES = {
+    "temperature_2m": ("temperature", 2, "celsius"), "apparent_temperature": ("apparent_temperature", 0, "celsius"),
+    "dew_point_2m": ("dew_point", 2, "celsius"), "relative_humidity_2m": ("relative_humidity", 2, "percentage"),
+    "wind_speed_10m": ("wind_speed", 10, "kilometres_per_hour"),
+    "wind_gusts_10m": ("wind_gusts", 10, "kilometres_per_hour"),
+    "wind_direction_10m": ("wind_direction", 10, "degree_direction"), "precipitation": ("precipitation", 0, "millimetre"),
+    "precipitation_probability": ("precipitation_probability", 0, "percentage"),
+    "weather_code": ("weather_code", 0, "wmo_code"), "pressure_msl": ("pressure_msl", 0, "hectopascal"),
+    "cloud_cover": ("cloud_cover", 0, "percentage"), "visibility": ("visibility", 0, "metre"),
+    "uv_index": ("uv_index", 0, "dimensionless"),
+}
+FB_AGGREGATIONS = {"_max": "maximum", "_min": "minimum", "_sum": "sum"}
+
+def request_params(points: list, days: int, hourly: list) -> dict:
+    """The query app.py's request_forecasts sends, with `days` and `hourly` swapped in."""
+    return {
+        "latitude": ",".join(str(lat) for lat, _ in points),
+        "longitude": ",".join(str(lon) for _, lon in points),
+        "timezone": "auto",
+        "current": ",".join(CURRENT_VARS),
+        "hourly": ",".join(hourly),
+        "daily": ",".join(DAILY_VARS),
+        "forecast_days": days,
+        "temperature_unit": "celsius",
+        "wind_speed_unit": "kmh",
+        "precipitation_unit": "mm",
+    }
+
+def series(var: str, hours: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Plausible hourly values of `var`: diurnal cycles plus noise, rounded as the API sends them."""
+    day = np.sin(2 * np.pi * (hours - 9) / 24)
+    n = len(hours)
+    if var in ("temperature_2m", "apparent_temperature", "dew_point_2m"):
+        offset = {"temperature_2m": 0, "apparent_temperature": -2, "dew_point_2m": -5}[var]
+        return np.round(12 + offset + 5 * day + rng.normal(0, 1, n).cumsum() * 0.3, 1)
+    if var == "precipitation":
+        return np.round(np.where(rng.random(n) < 0.8, 0, rng.gamma(0.6, 1.2, n)), 1)
+    if var in ("wind_speed_10m", "wind_gusts_10m"):
+        return np.round(np.abs(10 + 4 * day + rng.normal(0, 3, n)) * (1.8 if var == "wind_gusts_10m" else 1), 1)
+    if var == "pressure_msl":
+        return np.round(1013 + rng.normal(0, 1, n).cumsum() * 0.4, 1)
+    if var == "visibility":
+        return np.round(rng.uniform(8000, 40000, n), -1)
+    if var == "uv_index":
+        return np.round(np.clip(3 * day, 0, None), 2)
+    if var == "weather_code":
+        return rng.choice([0, 1, 2, 3, 45, 61, 63, 80], n).astype(float)
+    if var == "wind_direction_10m":
+        return np.round(rng.uniform(0, 360, n))
+    return np.round(np.clip(70 - 20 * day + rng.normal(0, 8, n), 0, 100))  # percentages
+
+def generate(location: tuple, days: int, hourly: list) -> dict:
+    """One location's response in the API's JSON layout, seeded by its coordinates."""
+    lat, lon, tz, abbr, offset, elevation = location
+    rng = np.random.default_rng([round((lat + 90) * 100), round((lon + 180) * 100)])
+    start = datetime(2024, 10, 15)
+    hours = np.arange(days * 24)
+    values = {v: series(v, hours, rng) for v in dict.fromkeys([*hourly, *CURRENT_VARS, "wind_speed_10m"])}
+    daily = {
+        "temperature_2m_max": values["temperature_2m"].reshape(days, 24).max(1),
+        "temperature_2m_min": values["temperature_2m"].reshape(days, 24).min(1),
+        "precipitation_sum": np.round(values["precipitation"].reshape(days, 24).sum(1), 1),
+        "wind_speed_10m_max": values["wind_speed_10m"].reshape(days, 24).max(1),
+    }
+    now = 12  # the current values are those of noon on the first day
+    return {
+        "latitude": lat, "longitude": lon, "generationtime_ms": round(float(rng.uniform(0.05, 0.5)), 6),
+        "utc_offset_seconds": offset, "timezone": tz, "timezone_abbreviation": abbr, "elevation": elevation,
+        "current_units": {"time": "iso8601", "interval": "seconds", **{v: UNITS[v] for v in CURRENT_VARS}},
+        "current": {"time": f"{start:%Y-%m-%d}T12:00", "interval": 900,
+                    **{v: float(values[v][now]) for v in CURRENT_VARS}},
+        "hourly_units": {"time": "iso8601", **{v: UNITS[v] for v in hourly}},
+        "hourly": {"time": [f"{start + timedelta(hours=int(h)):%Y-%m-%dT%H:%M}" for h in hours],
+                   **{v: values[v].tolist() for v in hourly}},
+        "daily_units": {"time": "iso8601", **{v: UNITS[v] for v in DAILY_VARS}},
+        "daily": {"time": [f"{start + timedelta(days=d):%Y-%m-%d}" for d in range(days)],
+                  **{v: a.tolist() for v, a in daily.items()}},
+    }
+
+def encode_flatbuffers(payload: dict) -> bytes:
+    """One location's JSON-layout response as a size-prefixed WeatherApiResponse message."""
+    import flatbuffers
+    from openmeteo_sdk.Aggregation import Aggregation
+    from openmeteo_sdk.Unit import Unit
+    from openmeteo_sdk.Variable import Variable
+
+    b = flatbuffers.Builder(4096)
+    offset = payload["utc_offset_seconds"]
+
+    def unix(local: str) -> int:
+        fmt = "%Y-%m-%dT%H:%M" if "T" in local else "%Y-%m-%d"
+        return calendar.timegm(datetime.strptime(local, fmt).timetuple()) - offset
+
+    def variable(name: str, value=None, values=None) -> int:
+        base, aggregation = name, "none"
+        for suffix, agg in FB_AGGREGATIONS.items():
+            if name.endswith(suffix):
+                base, aggregation = name[:-len(suffix)], agg
+        var, altitude, unit = FB_VARIABLES[base]
+        vec = b.CreateNumpyVector(np.asarray(values, np.float32)) if values is not None else None
+        b.StartObject(13)
+        if vec is not None:
+            b.PrependUOffsetTRelativeSlot(3, vec, 0)
+        if value is not None:
+            b.PrependFloat32Slot(2, value, 0.0)
+        b.PrependInt16Slot(5, altitude, 0)
+        b.PrependUint8Slot(0, getattr(Variable, var), 0)
+        b.PrependUint8Slot(1, getattr(Unit, unit), 0)
+        b.PrependUint8Slot(6, getattr(Aggregation, aggregation), 0)
+        return b.EndObject()
+
+    def block(start: int, end: int, interval: int, variables: list) -> int:
+        b.StartVector(4, len(variables), 4)
+        for v in reversed(variables):
+            b.PrependUOffsetTRelative(v)
+        vec = b.EndVector()
+        b.StartObject(4)
+        b.PrependInt64Slot(0, start, 0)
+        b.PrependInt64Slot(1, end, 0)
+        b.PrependInt32Slot(2, interval, 0)
+        b.PrependUOffsetTRelativeSlot(3, vec, 0)
+        return b.EndObject()
+
+    cur, hourly, daily = payload["current"], payload["hourly"], payload["daily"]
+    now = unix(cur["time"])
+    current = block(now, now + cur["interval"], cur["interval"],
+                    [variable(v, value=cur[v]) for v in CURRENT_VARS])
+    start = unix(hourly["time"][0])
+    hours = block(start, start + 3600 * len(hourly["time"]), 3600,
+                  [variable(v, values=hourly[v]) for v in hourly if v != "time"])
+    start = unix(daily["time"][0])
+    days = block(start, start + 86400 * len(daily["time"]), 86400,
+                 [variable(v, values=daily[v]) for v in daily if v != "time"])
+    tz, abbr = b.CreateString(payload["timezone"]), b.CreateString(payload["timezone_abbreviation"])
+    b.StartObject(15)
+    b.PrependUOffsetTRelativeSlot(11, hours, 0)
+    b.PrependUOffsetTRelativeSlot(10, days, 0)
+    b.PrependUOffsetTRelativeSlot(9, current, 0)
+    b.PrependUOffsetTRelativeSlot(8, abbr, 0)
+    b.PrependUOffsetTRelativeSlot(7, tz, 0)
+    b.PrependInt32Slot(6, offset, 0)
+    b.PrependFloat32Slot(3, payload["generationtime_ms"], 0.0)
+    b.PrependFloat32Slot(2, payload["elevation"], 0.0)
+    b.PrependFloat32Slot(1, payload["longitude"], 0.0)
+    b.PrependFloat32Slot(0, payload["latitude"], 0.0)
+    b.PrependUint8Slot(5, 1, 0)  # Model.best_match
+    b.FinishSizePrefixed(b.EndObject())
+    return bytes(b.Output())
+
+def record(points: list, days: int, hourly: list, offline: bool) -> dict:
+    """{"json": body, "fb": body} for one request."""
+    if not offline:
+        params = request_params([p[:2] for p in points], days, hourly)
+        bodies = {}
+        for ext, extra in (("json", {}), ("fb", {"format": "flatbuffers"})):
+            r = requests.get(FORECAST, params={**params, **extra}, timeout=30)
+            r.raise_for_status()
+            bodies[ext] = r.content
+        return bodies
+    payloads = [generate(p, days, hourly) for p in points]
+    body = json.dumps(payloads if len(payloads) > 1 else payloads[0], separators=(",", ":"), ensure_ascii=False)
+    return {"json": body.encode(), "fb": b"".join(encode_flatbuffers(p) for p in payloads)}
+
+def path(name: str, ext: str) -> str:
+    return os.path.join(PAYLOADS, f"{name}.{ext}.gz")
+
+def load(name: str, ext: str) -> bytes:
+    """A recorded body, decompressed."""
+    with gzip.open(path(name, ext), "rb") as f:
+        return f.read()
+
+def names() -> list:
+    return [f"{shape}_{n}" for shape in SHAPES for n in LOCATION_COUNTS]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--offline", action="store_true", help="generate bodies instead of calling the API")
+    ap.add_argument("--test-fixture", action="store_true", help="also write tests/fixtures/forecast_7d_2.*")
+    args = ap.parse_args()
+    os.makedirs(PAYLOADS, exist_ok=True)
+    for shape, (days, hourly) in SHAPES.items():
+        for n in LOCATION_COUNTS:
+            for ext, body in record(LOCATIONS[:n], days, hourly, args.offline).items():
+                with gzip.GzipFile(path(f"{shape}_{n}", ext), "wb", mtime=0) as f:
+                    f.write(body)
+                print(f"{shape}_{n}.{ext}: {len(body) / 1024:.1f} KB")
+    if args.test_fixture:
+        for ext, body in record(LOCATIONS[:2], *SHAPES["7d"], args.offline).items():
+            with open(os.path.join(FIXTURES, f"forecast_7d_2.{ext}"), "wb") as f:
+                f.write(body)
+    print("generated offline" if args.offline else f"recorded from {FORECAST}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# A stand-in for the Open-Meteo hosts: patches requests.Session.get so forecast, reverse-geocoding
+# and timezone calls are answered locally after a simulated round trip. Forecasts reuse the
+# recorded 7-day body with each requested coordinate filled in.
+import json
+import threading
+import time
+from unittest import mock
+
+import requests
+
+import record_payloads
+
+class StubUpstream:
+    def __init__(self, latency: float = 0.08, per_location: float = 0.0005):
+        """`latency` s per request plus `per_location` s for each location in a forecast batch."""
+        self.latency, self.per_location = latency, per_location
+        self.template = json.loads(record_payloads.load("7d_1", "json"))
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.locations = 0
+        self._patch = mock.patch.object(requests.Session, "get", self._get)
+
+    def __enter__(self):
+        self._patch.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._patch.stop()
+
+    def _get(self, url, params=None, **kwargs) -> requests.Response:  # replaces Session.get: no session arg
+        params = params or {}
+        if "forecast" in url:
+            points = list(zip(str(params["latitude"]).split(","), str(params["longitude"]).split(",")))
+            body = [dict(self.template, latitude=float(lat), longitude=float(lon)) for lat, lon in points]
+            body = body[0] if len(body) == 1 else body
+        elif "reverse" in url:
+            points = [None]
+            body = {"results": [{"name": "Stubville", "admin1": "Stub", "country": "Nowhere", "timezone": "UTC"}]}
+        else:
+            points = [None]
+            body = {"timezone": "UTC"}
+        with self._lock:
+            self.requests += 1
+            self.locations += len(points)
+        time.sleep(self.latency + self.per_location * len(points))
+        r = requests.Response()
+        r.status_code, r.url = 200, url
+        r._content = json.dumps(body).encode()
+        return r
@@ -0,0 +1,89 @@
+# Rasterize timezone boundary polygons into the grid app.py memory-maps for offline lookups.
+#
+#   python build_tz_grid.py combined-with-oceans.json --res 0.1
+#
+# Input: a GeoJSON release of https://github.com/evansiroky/timezone-boundary-builder
+# (the "with-oceans" variant so sea clicks resolve to Etc/GMT±N). Needs shapely>=2 at build time only.
+import argparse
+import json
+import os
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+import tzgrid
+from tzgrid import TZ_BORDER
+
+def build(features: list, res: float) -> tuple[np.ndarray, list, dict]:
+    names = [""] + sorted({f["properties"]["tzid"] for f in features})
+    ids = np.array([names.index(f["properties"]["tzid"]) for f in features], dtype=np.uint16)
+    geoms = np.array([shape(f["geometry"]) for f in features])
+    tree = shapely.STRtree(geoms)  # R-tree over polygon bounds
+
+    h, w = round(180 / res), round(360 / res)
+    lons = -180 + (np.arange(w) + 0.5) * res
+    grid = np.zeros((h, w), dtype=np.uint16)
+    for i in range(h):  # one row at a time keeps memory flat at fine resolutions
+        lat = 90 - (i + 0.5) * res
+        pts, polys = tree.query(shapely.points(lons, np.full(w, lat)), predicate="within")
+        grid[i, pts] = ids[polys]
+
+    border = np.zeros(grid.shape, dtype=bool)
+    border[:-1] |= grid[:-1] != grid[1:]
+    border[1:] |= grid[1:] != grid[:-1]
+    border |= grid != np.roll(grid, 1, axis=1)
+    border |= grid != np.roll(grid, -1, axis=1)
+    grid[border] |= TZ_BORDER
+    return grid, names, border_pieces(border, geoms, ids, tree, res)
+
+def border_pieces(border: np.ndarray, geoms: np.ndarray, ids: np.ndarray, tree, res: float) -> dict:
+    """Each zone's polygons clipped to each border cell, in tzgrid's border-array layout."""
+    w = border.shape[1]
+    cells, zones, sizes, xy = [], [], [], []
+    for i in np.flatnonzero(border.any(axis=1)):
+        js = np.flatnonzero(border[i])
+        north = 90 - i * res
+        boxes = shapely.box(-180 + js * res, north - res, -180 + (js + 1) * res, north)
+        cell_idx, geom_idx = tree.query(boxes, predicate="intersects")
+        order = np.argsort(cell_idx, kind="stable")
+        cell_idx, geom_idx = cell_idx[order], geom_idx[order]
+        clipped = shapely.intersection(geoms[geom_idx], boxes[cell_idx])
+        parts, part_piece = shapely.get_parts(clipped, return_index=True)
+        polygons = shapely.get_type_id(parts) == 3  # clipping can leave edge-only lines/points
+        rings, ring_part = shapely.get_rings(parts[polygons], return_index=True)
+        coords, coord_ring = shapely.get_coordinates(rings, return_index=True)
+        ring_piece = part_piece[polygons][ring_part]
+        ring_len = np.bincount(coord_ring, minlength=len(rings))
+        piece_len = np.bincount(ring_piece, weights=ring_len + 1, minlength=len(clipped)).astype(np.int64)
+        keep = piece_len > 0
+        cells.append(i * w + js[cell_idx[keep]])
+        zones.append(ids[geom_idx[keep]])
+        sizes.append(piece_len[keep])
+        xy.append(np.insert(coords, np.cumsum(ring_len), np.nan, axis=0).astype(np.float32))
+    piece_cells = np.concatenate(cells) if cells else np.empty(0, np.int64)
+    cell_ids, per_cell = np.unique(piece_cells, return_counts=True)
+    return {
+        "cells": cell_ids.astype(np.int64),
+        "pieces": np.concatenate([[0], np.cumsum(per_cell)]).astype(np.int64),
+        "zones": np.concatenate(zones).astype(np.uint16) if zones else np.empty(0, np.uint16),
+        "rings": np.concatenate([[0], np.cumsum(np.concatenate(sizes) if sizes else [])]).astype(np.int64),
+        "xy": np.concatenate(xy) if xy else np.empty((0, 2), np.float32),
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("geojson")
+    ap.add_argument("--res", type=float, default=0.1, help="cell size in degrees")
+    ap.add_argument("--out", default=os.path.join(os.path.dirname(__file__), "data", "tz_grid.npy"))
+    args = ap.parse_args()
+
+    with open(args.geojson, encoding="utf-8") as f:
+        features = json.load(f)["features"]
+    grid, names, border = build(features, args.res)
+    tzgrid.save(args.out, grid, names, border)
+    print(f"{args.out}: {grid.shape[1]}x{grid.shape[0]} cells, {len(names) - 1} zones, "
+          f"{len(border['cells'])} border cells refined by {len(border['zones'])} polygon pieces")
+
+if __name__ == "__main__":
+    main()
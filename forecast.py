@@ -0,0 +1,103 @@
+# Open-Meteo forecast payloads: the columnar form the app caches (hourly/daily float32 DataFrames
+# in SI units), unit conversion for display, and the spatial snapping of cache keys.
+import numpy as np
+import pandas as pd
+
+try:  # optional: Open-Meteo FlatBuffers responses (WEATHER_FORECAST_FORMAT=flatbuffers)
+    from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+except ImportError:
+    WeatherApiResponse = None
+
+CURRENT_VARS = ["temperature_2m","apparent_temperature","relative_humidity_2m","wind_speed_10m","precipitation"]
+HOURLY_VARS = ["temperature_2m","precipitation","wind_speed_10m"]
+DAILY_VARS = ["temperature_2m_max","temperature_2m_min","precipitation_sum","wind_speed_10m_max"]
+
+def parse_forecast(payload: dict) -> dict:
+    """Columnar form of a forecast payload: hourly/daily float32 DataFrames on a parsed
+    DatetimeIndex, plus the `current` values and `timezone` as sent."""
+    def block(name: str, variables: list, time_format: str) -> pd.DataFrame:
+        raw = payload.get(name) or {}
+        index = pd.to_datetime(raw.get("time", []), format=time_format)
+        return pd.DataFrame(
+            {v: np.asarray(raw.get(v) or np.full(len(index), np.nan), dtype=np.float32) for v in variables},
+            index=index,
+        )
+    return {
+        "timezone": payload.get("timezone", "auto"),
+        "elevation": payload.get("elevation"),
+        "current": payload.get("current") or {},
+        "hourly": block("hourly", HOURLY_VARS, "%Y-%m-%dT%H:%M"),
+        "daily": block("daily", DAILY_VARS, "%Y-%m-%d"),
+    }
+
+def flatbuffers_messages(body: bytes) -> list:
+    """Split a format=flatbuffers body (little-endian length-prefixed messages, one per location)."""
+    messages, pos = [], 0
+    while pos < len(body):
+        size = int.from_bytes(body[pos:pos + 4], "little")
+        messages.append(WeatherApiResponse.GetRootAs(body, pos + 4))
+        pos += size + 4
+    return messages
+
+def parse_forecast_flatbuffers(resp) -> dict:
+    """parse_forecast's columnar form from one FlatBuffers message. Variables come back in
+    request order; ValuesAsNumpy() are float32 views over the response buffer."""
+    offset = resp.UtcOffsetSeconds()
+    def block(vwt, variables: list) -> pd.DataFrame:
+        if vwt is None:
+            return pd.DataFrame({v: np.empty(0, np.float32) for v in variables}, index=pd.DatetimeIndex([]))
+        index = pd.to_datetime(np.arange(vwt.Time(), vwt.TimeEnd(), vwt.Interval()) + offset, unit="s")
+        return pd.DataFrame({v: vwt.Variables(i).ValuesAsNumpy() for i, v in enumerate(variables)}, index=index)
+    cur = resp.Current()
+    tz = resp.Timezone()
+    return {
+        "timezone": tz.decode() if isinstance(tz, bytes) else tz or "auto",
+        "elevation": resp.Elevation(),
+        "current": {v: cur.Variables(i).Value() for i, v in enumerate(CURRENT_VARS)} if cur is not None else {},
+        "hourly": block(resp.Hourly(), HOURLY_VARS),
+        "daily": block(resp.Daily(), DAILY_VARS),
+    }
+
+def snap_cell(snap: str):
+    """(lat step, lon step) in degrees for a FORECAST_SNAP setting."""
+    if snap.startswith("geohash:"):
+        bits = 5 * int(snap.split(":", 1)[1])
+        return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** (bits - bits // 2)
+    step = float(snap)
+    return step, step
+
+def snap_point(lat: float, lon: float, snap: str):
+    """Centre of the snap cell containing (lat, lon); a step of 0 leaves points untouched."""
+    dlat, dlon = snap_cell(snap)
+    if not dlat:
+        return lat, lon
+    if snap.startswith("geohash:"):  # geohash cells are aligned to -90/-180, report their centre
+        return (np.floor((lat + 90) / dlat) + 0.5) * dlat - 90, (np.floor((lon + 180) / dlon) + 0.5) * dlon - 180
+    return round(round(lat / dlat) * dlat, 6), round(round(lon / dlon) * dlon, 6)
+
+def convert(values, kind: str, metric: bool) -> np.ndarray:
+    """Cached SI values in the selected units; `kind` is "temp" or "wind" (missing → NaN)."""
+    a = np.asarray(values if values is not None else np.nan, dtype=float)
+    if metric:
+        return a
+    return a * 1.8 + 32 if kind == "temp" else a / 1.609344
+
+def as_float(x) -> float:
+    """Open-Meteo sends null for values it lacks; NaN keeps them numeric."""
+    return np.nan if x is None else float(x)
+
+def fmt(x: float, digits: int = 1) -> str:
+    x = as_float(x)
+    return "–" if np.isnan(x) else f"{x:.{digits}f}"
+
+def bilinear(grid: np.ndarray, r, c) -> np.ndarray:
+    """Sample `grid` at fractional node coordinates (r, c), clamped to its edges."""
+    r = np.clip(r, 0, grid.shape[0] - 1)
+    c = np.clip(c, 0, grid.shape[1] - 1)
+    r0 = np.minimum(np.floor(r).astype(int), grid.shape[0] - 2) if grid.shape[0] > 1 else np.zeros_like(r, int)
+    c0 = np.minimum(np.floor(c).astype(int), grid.shape[1] - 2) if grid.shape[1] > 1 else np.zeros_like(c, int)
+    r1, c1 = np.minimum(r0 + 1, grid.shape[0] - 1), np.minimum(c0 + 1, grid.shape[1] - 1)
+    fr, fc = r - r0, c - c0
+    top = grid[r0, c0] * (1 - fc) + grid[r0, c1] * fc
+    bottom = grid[r1, c0] * (1 - fc) + grid[r1, c1] * fc
+    return top * (1 - fr) + bottom * fr
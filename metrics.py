@@ -0,0 +1,37 @@
+# Process-wide counters and phase histograms, exported in the Prometheus text format.
+import threading
+from collections import Counter
+
+class Metrics:
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = Counter()
+        self.hist = {}  # phase -> [bucket counts..., +Inf count, sum]
+
+    def inc(self, name: str, n: int = 1):
+        with self._lock:
+            self.counts[name] += n
+
+    def observe(self, phase: str, seconds: float):
+        with self._lock:
+            h = self.hist.setdefault(phase, [0] * (len(self.BUCKETS) + 2))
+            h[sum(seconds > b for b in self.BUCKETS)] += 1
+            h[-1] += seconds
+
+    def prometheus(self) -> str:
+        """Counters and histograms in the Prometheus text exposition format."""
+        with self._lock:
+            counts, hist = dict(self.counts), {k: list(v) for k, v in self.hist.items()}
+        lines = ["# TYPE weather_events_total counter"]
+        lines += [f'weather_events_total{{name="{k}"}} {v}' for k, v in sorted(counts.items())]
+        lines.append("# TYPE weather_phase_seconds histogram")
+        for phase, h in sorted(hist.items()):
+            total = 0
+            for le, n in zip([*map(str, self.BUCKETS), "+Inf"], h[:-1]):
+                total += n
+                lines.append(f'weather_phase_seconds_bucket{{phase="{phase}",le="{le}"}} {total}')
+            lines.append(f'weather_phase_seconds_sum{{phase="{phase}"}} {h[-1]:.6f}')
+            lines.append(f'weather_phase_seconds_count{{phase="{phase}"}} {total}')
+        return "\n".join(lines) + "\n"
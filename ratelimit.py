@@ -0,0 +1,99 @@
+# Token buckets per upstream host, stored in SQLite so every worker process on the node shares them.
+#
+# Calls are interactive (a page run waits on them) or background (warm-up, stale refreshes,
+# overlay backfills, marked with `background_priority`). Background calls may only draw while
+# `reserve` of the burst stays free, and queue longer before giving up.
+import math
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from metrics import Metrics
+
+class RateLimited(requests.RequestException):
+    pass
+
+@contextmanager
+def background_priority():
+    """Mark upstream calls made by this thread inside the block as background traffic."""
+    t = threading.current_thread()
+    prev = getattr(t, "background_priority", False)
+    t.background_priority = True
+    try:
+        yield
+    finally:
+        t.background_priority = prev
+
+def is_background() -> bool:
+    return getattr(threading.current_thread(), "background_priority", False)
+
+class RateLimiter:
+    def __init__(self, path: str, limits: dict, reserve: float = 0.5, max_wait: dict = None,
+                 metrics: Metrics = None):
+        """`limits` maps host -> (tokens/s, burst); `reserve` is the fraction of the burst kept
+        for interactive calls; `max_wait` maps background (bool) -> seconds a call may queue."""
+        self._lock = threading.Lock()
+        self.limits, self.reserve = limits, reserve
+        self.max_wait = max_wait or {False: 5.0, True: 60.0}
+        self.metrics = metrics or Metrics()
+        self.db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS buckets (host TEXT PRIMARY KEY, tokens REAL, updated_at REAL)")
+
+    def take(self, host: str, cost: float, rate: float, burst: float, reserve: float) -> float:
+        """Take `cost` tokens and return 0 once `reserve` would remain, else the seconds to wait.
+        A cost above what the bucket can hold is taken once it is full, leaving it in debt
+        (negative) until the refill has paid for every token."""
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")  # one writer across processes: refill + take is atomic
+            try:
+                row = self.db.execute("SELECT tokens, updated_at FROM buckets WHERE host = ?", (host,)).fetchone()
+                now = time.time()
+                tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+                need = min(cost, burst - reserve)
+                short = need + reserve - tokens
+                wait = 0.0 if short <= 0 else short / rate if rate else math.inf
+                if not wait:
+                    tokens -= cost
+                self.db.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (host, tokens, now))
+                self.db.execute("COMMIT")
+            except Exception:
+                if self.db.in_transaction:  # some errors already rolled back; a bare ROLLBACK would mask them
+                    self.db.execute("ROLLBACK")
+                raise
+        return wait
+
+    def acquire(self, host: str, cost: float = 1):
+        """Block until `cost` tokens are taken for `host`; RateLimited past the priority's max wait."""
+        if host not in self.limits:
+            return
+        rate, burst = self.limits[host]
+        background = is_background()
+        reserve = burst * self.reserve if background else 0.0
+        deadline = time.monotonic() + self.max_wait[background]
+        while True:
+            wait = self.take(host, cost, rate, burst, reserve)
+            if not wait:
+                return
+            self.metrics.inc(f"ratelimit.{host}.{'background' if background else 'interactive'}.waits")
+            if time.monotonic() + wait > deadline:
+                self.metrics.inc(f"ratelimit.{host}.rejected")
+                raise RateLimited(f"rate limit for {host} exceeded")
+            time.sleep(wait)
+
+    def batch_size(self, host: str, size: int) -> int:
+        """Locations per request for this thread, each request charged on its own. Interactive
+        batches fit in what the bucket refills within their max wait, so none is rejected for
+        needing more tokens than it can ever be granted in time or left in debt for the next click.
+        Background batches are capped to the part of the burst above the interactive reserve."""
+        if host not in self.limits:
+            return size
+        rate, burst = self.limits[host]
+        if is_background():
+            cap = burst * (1 - self.reserve)
+        else:
+            cap = min(burst, rate * (self.max_wait[False] - 1)) if rate else burst  # a second to spare
+        return max(1, min(size, int(cap)))
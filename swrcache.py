@@ -0,0 +1,235 @@
+# Stale-while-revalidate cache with single-flight loads: per-helper LRU byte budgets in memory,
+# backed by an optional SQLite tier shared by every worker process on the node.
+#
+# Keys are tuples whose first item names the cached helper. An entry younger than its soft TTL
+# is fresh; between soft and hard it is served stale while one background refresh runs; older
+# than hard, callers block on a load. Concurrent loads of one key share a single Future.
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
+from metrics import Metrics
+from ratelimit import background_priority
+
+def spawn_thread(fn):
+    """Default `spawn` for stale refreshes: a daemon thread at background priority."""
+    def run():
+        with background_priority():
+            fn()
+    threading.Thread(target=run, daemon=True).start()
+
+class DiskCache:
+    """SQLite L2 tier; values are zlib-compressed pickles with their storage time and hard expiry.
+    Rows written under another `schema` are ignored; every `prune_every` writes expired rows are
+    deleted, then the oldest rows past `max_rows`."""
+    def __init__(self, path: str, schema: int = 1, max_rows: int = 200000, prune_every: int = 1000):
+        self._lock = threading.Lock()
+        self.schema, self.max_rows, self.prune_every = schema, max_rows, prune_every
+        self.writes = 0
+        self.db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        with self._lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")  # readers in other processes never block writers
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS cache "
+                            "(key TEXT PRIMARY KEY, stored_at REAL, expires_at REAL, value BLOB)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS cache_stored_at ON cache (stored_at)")
+        self.prune()
+
+    def prune(self):
+        """Delete expired rows, then the oldest rows past `max_rows`."""
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+            self.db.execute("DELETE FROM cache WHERE stored_at <= (SELECT stored_at FROM cache "
+                            "ORDER BY stored_at DESC LIMIT 1 OFFSET ?)", (self.max_rows,))
+
+    def get(self, key: tuple):
+        try:
+            with self._lock:
+                row = self.db.execute("SELECT stored_at, value FROM cache WHERE key = ? AND expires_at >= ?",
+                                      (f"{self.schema}:{key!r}", time.time())).fetchone()
+            return (row[0], pickle.loads(zlib.decompress(row[1]))) if row else None
+        except Exception:
+            return None
+
+    def put(self, key: tuple, stored_at: float, hard: float, value):
+        try:
+            blob = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            with self._lock, self.db:
+                self.db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                                (f"{self.schema}:{key!r}", stored_at, stored_at + hard, blob))
+                self.writes += 1
+                due = self.writes % self.prune_every == 0
+            if due:
+                self.prune()
+        except Exception:
+            pass  # the in-memory tier still has it
+
+    def clear(self):
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM cache")
+
+class SWRCache:
+    def __init__(self, disk: DiskCache = None, budgets: dict = None, metrics: Metrics = None,
+                 spawn=None, untracked_thread: str = None):
+        """`budgets` maps helper name -> in-memory bytes (0 when missing: keep the newest entry only);
+        `spawn(fn)` runs a stale refresh in the background; lookups from the thread named
+        `untracked_thread` (the warm-up job) are left out of the access log."""
+        self._lock = threading.Lock()
+        self.disk = disk
+        self.budgets = budgets or {}
+        self.metrics = metrics or Metrics()
+        self.spawn = spawn or spawn_thread
+        self.untracked_thread = untracked_thread
+        self.entries = {}  # helper name -> OrderedDict(key -> (stored_at, value, size)), LRU first
+        self.resident = Counter()  # helper name -> bytes held
+        self.inflight = {}  # key -> Future of the one load running for it
+        self.access = Counter()  # key -> requests, feeds the warm-up job
+
+    def lookup(self, key: tuple):
+        with self._lock:
+            hit = self.entries.get(key[0], {}).get(key)
+            if hit is not None:
+                self.entries[key[0]].move_to_end(key)
+        return hit
+
+    def put(self, key: tuple, stored_at: float, value):
+        """Keep `value` in memory, evicting LRU entries of the same helper past its budget."""
+        name, size = key[0], len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            lru = self.entries.setdefault(name, OrderedDict())
+            old = lru.pop(key, None)
+            if old is not None:
+                self.resident[name] -= old[2]
+            lru[key] = (stored_at, value, size)
+            self.resident[name] += size
+            budget = self.budgets.get(name, 0)
+            evicted = 0
+            while self.resident[name] > budget and len(lru) > 1:
+                _, (_, _, freed) = lru.popitem(last=False)
+                self.resident[name] -= freed
+                evicted += 1
+        if evicted:
+            self.metrics.inc(f"cache.{name}.evictions", evicted)
+
+    def stats(self) -> dict:
+        """helper name -> (entries, resident bytes)"""
+        with self._lock:
+            return {name: (len(lru), self.resident[name]) for name, lru in self.entries.items()}
+
+    def top(self, name: str, n: int) -> list:
+        """The `n` most requested keys of helper `name`."""
+        with self._lock:
+            return [k for k, _ in self.access.most_common() if k[0] == name][:n]
+
+    def peek(self, key: tuple):
+        """(stored_at, value) from memory, else from disk (promoted to memory), else None."""
+        hit = self.lookup(key)
+        if hit is None and self.disk is not None:
+            hit = self.disk.get(key)
+            if hit is not None:
+                self.metrics.inc(f"cache.{key[0]}.disk")
+                self.put(key, *hit)
+        return hit
+
+    def store(self, key: tuple, value, hard: float):
+        now = time.time()
+        self.put(key, now, value)
+        if self.disk is not None:
+            self.disk.put(key, now, hard, value)
+
+    def get(self, key: tuple, load, soft: float, hard: float):
+        if threading.current_thread().name != self.untracked_thread:
+            with self._lock:
+                self.access[key] += 1
+                if len(self.access) > 20000:  # keep the access log bounded
+                    self.access = Counter(dict(self.access.most_common(10000)))
+        hit = self.peek(key)
+        if hit is not None:
+            age = time.time() - hit[0]
+            if age < soft:
+                self.metrics.inc(f"cache.{key[0]}.hit")
+                return hit[1]
+            if age < hard:
+                self.metrics.inc(f"cache.{key[0]}.stale")
+                self.refresh(key, load, hard)
+                return hit[1]
+        self.metrics.inc(f"cache.{key[0]}.miss")
+        return self.load(key, load, hard)
+
+    def load(self, key: tuple, load, hard: float):
+        """Single-flight: concurrent callers for `key` share one `load()` and its result."""
+        with self._lock:
+            fut = self.inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self.inflight[key] = Future()
+        if not leader:
+            self.metrics.inc("singleflight.coalesced")
+            return fut.result()
+        self.metrics.inc("singleflight.issued")
+        try:
+            value = load()
+            self.store(key, value, hard)
+            fut.set_result(value)
+        except Exception as e:
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                del self.inflight[key]
+        return fut.result()
+
+    def claim(self, keys: list) -> tuple:
+        """Batch single-flight: ({key: Future} for the keys this caller must load via `fulfil`,
+        {key: Future} for the keys another load already has in flight)."""
+        owned, waiting = {}, {}
+        with self._lock:
+            for key in keys:
+                if key in self.inflight:
+                    waiting[key] = self.inflight[key]
+                else:
+                    owned[key] = self.inflight[key] = Future()
+        if owned:
+            self.metrics.inc("singleflight.issued", len(owned))
+        return owned, waiting
+
+    def fulfil(self, owned: dict, load, hard: float):
+        """Store `load(keys)` (values in key order) for claimed keys and resolve their futures;
+        a failure is set on the futures rather than raised, and so is a short result, since a
+        future left pending would block its waiters forever."""
+        error = None
+        try:
+            for (key, fut), value in zip(owned.items(), load(list(owned))):
+                self.store(key, value, hard)
+                fut.set_result(value)
+        except Exception as e:
+            error = e
+        finally:
+            for fut in owned.values():
+                if not fut.done():
+                    fut.set_exception(error or LookupError(f"load returned fewer than {len(owned)} values"))
+            with self._lock:
+                for key in owned:
+                    del self.inflight[key]
+
+    def refresh(self, key: tuple, load, hard: float):
+        """Reload `key` in the background unless a load for it is already running."""
+        with self._lock:
+            if key in self.inflight:
+                return
+        def run():
+            try:
+                self.load(key, load, hard)
+            except Exception:
+                pass  # keep serving the stale value; a later call retries
+        self.spawn(run)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.resident.clear()
+        if self.disk is not None:
+            self.disk.clear()
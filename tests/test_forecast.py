@@ -0,0 +1,90 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast import (CURRENT_VARS, DAILY_VARS, HOURLY_VARS, bilinear, convert, flatbuffers_messages, fmt,
+                      parse_forecast, parse_forecast_flatbuffers, snap_cell, snap_point)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+PAYLOAD = {
+    "latitude": 48.86, "longitude": 2.35, "timezone": "Europe/Paris", "elevation": 43.0,
+    "current": {"temperature_2m": 12.5, "relative_humidity_2m": None},
+    "hourly": {"time": ["2024-10-15T00:00", "2024-10-15T01:00"],
+               "temperature_2m": [11.0, None], "precipitation": [0.0, 0.2], "wind_speed_10m": [7.2, 8.1]},
+    "daily": {"time": ["2024-10-15"], "temperature_2m_max": [15.5], "temperature_2m_min": [9.5],
+              "precipitation_sum": [1.2], "wind_speed_10m_max": [20.0]},
+}
+
+def test_snap_point_rounds_to_the_step_grid():
+    assert snap_point(48.8566, 2.3522, "0.05") == (48.85, 2.35)
+    assert snap_point(-33.8688, 151.2093, "0.1") == (-33.9, 151.2)
+    assert snap_point(48.8566, 2.3522, "0") == (48.8566, 2.3522)
+
+def test_snap_point_geohash_cell_centres():
+    dlat, dlon = snap_cell("geohash:5")
+    assert (dlat, dlon) == (180 / 2**12, 360 / 2**13)
+    lat, lon = snap_point(48.8566, 2.3522, "geohash:5")
+    assert abs(lat - 48.8566) <= dlat / 2 and abs(lon - 2.3522) <= dlon / 2
+    assert snap_point(48.857, 2.353, "geohash:5") == (lat, lon)  # same cell, same key
+
+def test_convert_keeps_si_units_or_converts_to_imperial():
+    assert convert([0.0, 100.0], "temp", True).tolist() == [0.0, 100.0]
+    assert convert([0.0, 100.0], "temp", False).tolist() == [32.0, 212.0]
+    assert convert(16.09344, "wind", False) == pytest.approx(10.0)
+    assert np.isnan(convert(None, "temp", False))
+
+def test_fmt_shows_missing_values_as_a_dash():
+    assert fmt(12.345) == "12.3"
+    assert fmt(70, 0) == "70"
+    assert fmt(None) == fmt(np.nan) == "–"
+
+def test_parse_forecast_builds_float32_frames_on_parsed_times():
+    f = parse_forecast(PAYLOAD)
+    assert f["timezone"] == "Europe/Paris" and f["elevation"] == 43.0
+    assert f["current"]["relative_humidity_2m"] is None  # current values are kept as sent
+    assert list(f["hourly"].columns) == HOURLY_VARS and list(f["daily"].columns) == DAILY_VARS
+    assert (f["hourly"].dtypes == np.float32).all()
+    assert str(f["hourly"].index[1]) == "2024-10-15 01:00:00"
+    assert np.isnan(f["hourly"]["temperature_2m"].iloc[1])  # null → NaN
+    assert f["daily"]["temperature_2m_max"].iloc[0] == 15.5
+
+def test_parse_forecast_tolerates_missing_blocks_and_variables():
+    f = parse_forecast({"daily": {"time": ["2024-10-15", "2024-10-16"], "temperature_2m_max": [1, 2]}})
+    assert f["timezone"] == "auto" and f["current"] == {} and f["hourly"].empty
+    assert f["daily"]["temperature_2m_max"].tolist() == [1, 2]
+    assert f["daily"]["precipitation_sum"].isna().all()
+
+def test_flatbuffers_body_parses_like_its_json_twin():
+    # forecast_7d_2.*: one 2-location request in both formats (benchmarks/record_payloads.py --test-fixture)
+    pytest.importorskip("openmeteo_sdk")
+    with open(os.path.join(FIXTURES, "forecast_7d_2.fb"), "rb") as f:
+        messages = flatbuffers_messages(f.read())
+    with open(os.path.join(FIXTURES, "forecast_7d_2.json"), encoding="utf-8") as f:
+        payloads = json.load(f)
+    assert len(messages) == len(payloads) == 2
+    for message, payload in zip(messages, payloads):
+        fb, js = parse_forecast_flatbuffers(message), parse_forecast(payload)
+        assert fb["timezone"] == js["timezone"]
+        assert fb["elevation"] == pytest.approx(js["elevation"])
+        assert fb["current"] == pytest.approx({v: js["current"][v] for v in CURRENT_VARS})
+        for block in ("hourly", "daily"):
+            assert (fb[block].dtypes == np.float32).all()
+            pd.testing.assert_frame_equal(fb[block], js[block], check_freq=False)
+    assert str(parse_forecast_flatbuffers(messages[0])["hourly"].index[0]) == "2024-10-15 00:00:00"  # local time
+
+def test_bilinear_interpolates_between_nodes_and_clamps_at_edges():
+    grid = np.array([[0.0, 10.0], [20.0, 30.0]])
+    assert bilinear(grid, 0, 0) == 0 and bilinear(grid, 1, 1) == 30
+    assert bilinear(grid, 0.5, 0.5) == pytest.approx(15)
+    assert bilinear(grid, 0.25, 1.0) == pytest.approx(15)
+    assert bilinear(grid, -1, 5) == 10  # clamped to the top-right node
+    r, c = np.array([[0.0], [1.0]]), np.array([[0.0, 0.5, 1.0]])
+    assert bilinear(grid, r, c).tolist() == [[0, 5, 10], [20, 25, 30]]
+
+def test_bilinear_on_a_single_row_or_column():
+    assert bilinear(np.array([[1.0, 3.0]]), 0.7, 0.5) == pytest.approx(2)
+    assert bilinear(np.array([[1.0], [3.0]]), 0.5, 0.3) == pytest.approx(2)
@@ -0,0 +1,68 @@
+import pytest
+
+import ratelimit
+from metrics import Metrics
+from ratelimit import RateLimited, RateLimiter, background_priority
+
+HOST = "api.example"
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, "time", clock.time)
+    return clock
+
+@pytest.fixture
+def limiter(tmp_path):
+    return RateLimiter(str(tmp_path / "ratelimit.sqlite"), {HOST: (5, 30)}, reserve=0.5, metrics=Metrics())
+
+def tokens(limiter):
+    return limiter.db.execute("SELECT tokens FROM buckets WHERE host = ?", (HOST,)).fetchone()[0]
+
+def test_take_draws_from_a_full_bucket_then_waits_for_the_refill(limiter, clock):
+    assert limiter.take(HOST, 20, 5, 30, 0) == 0
+    assert tokens(limiter) == 10
+    assert limiter.take(HOST, 15, 5, 30, 0) == pytest.approx(1.0)  # 5 short at 5/s
+    assert tokens(limiter) == 10  # a refused take leaves the tokens alone
+    clock.now += 1
+    assert limiter.take(HOST, 15, 5, 30, 0) == 0
+    assert tokens(limiter) == 0
+
+def test_cost_above_the_burst_waits_for_a_full_bucket_and_leaves_debt(limiter, clock):
+    limiter.take(HOST, 10, 5, 30, 0)
+    assert limiter.take(HOST, 100, 5, 30, 0) == pytest.approx(2.0)  # needs the bucket full, not 100
+    clock.now += 2
+    assert limiter.take(HOST, 100, 5, 30, 0) == 0
+    assert tokens(limiter) == -70
+    assert limiter.take(HOST, 1, 5, 30, 0) == pytest.approx(71 / 5)  # the debt is paid off first
+
+def test_background_takes_keep_the_reserve_free(limiter, clock):
+    assert limiter.take(HOST, 10, 5, 30, 15) == 0
+    assert limiter.take(HOST, 10, 5, 30, 15) == pytest.approx(1.0)  # would leave 10 < 15
+    assert limiter.take(HOST, 10, 5, 30, 0) == 0  # interactive calls may use the reserve
+
+def test_zero_rate_never_refills(limiter, clock):
+    assert limiter.take(HOST, 30, 0, 30, 0) == 0
+    clock.now += 3600
+    assert limiter.take(HOST, 1, 0, 30, 0) == float("inf")
+
+def test_acquire_rejects_calls_that_would_wait_too_long(limiter, clock):
+    limiter.acquire(HOST, 30)
+    with pytest.raises(RateLimited):
+        limiter.acquire(HOST, 30)  # 6 s to refill, interactive calls wait at most 5 s
+    assert limiter.metrics.counts[f"ratelimit.{HOST}.rejected"] == 1
+    limiter.acquire("unlimited.example", 1000)
+
+def test_batch_size_fits_interactive_waits_and_background_share(limiter):
+    assert limiter.batch_size(HOST, 100) == 20  # what refills in 4 of the 5 s an interactive call may wait
+    assert limiter.batch_size(HOST, 8) == 8
+    with background_priority():
+        assert limiter.batch_size(HOST, 100) == 15  # the burst above the interactive reserve
+    assert limiter.batch_size("unlimited.example", 100) == 100
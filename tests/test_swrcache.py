@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+
+from metrics import Metrics
+from swrcache import DiskCache, SWRCache
+
+SOFT, HARD = 60, 600
+
+@pytest.fixture
+def jobs():
+    return []  # background refreshes, run by the test when it chooses
+
+@pytest.fixture
+def cache(jobs):
+    return SWRCache(budgets={"f": 10_000}, metrics=Metrics(), spawn=jobs.append)
+
+def loader(value, calls):
+    def load():
+        calls.append(value)
+        return value
+    return load
+
+def test_fresh_entries_are_served_from_memory(cache):
+    calls = []
+    assert cache.get(("f", 1), loader("a", calls), SOFT, HARD) == "a"
+    assert cache.get(("f", 1), loader("b", calls), SOFT, HARD) == "a"
+    assert calls == ["a"]
+    assert cache.metrics.counts["cache.f.miss"] == cache.metrics.counts["cache.f.hit"] == 1
+
+def test_stale_entries_are_served_while_one_refresh_runs(cache, jobs):
+    cache.put(("f", 1), time.time() - SOFT - 1, "old")
+    calls = []
+    assert cache.get(("f", 1), loader("new", calls), SOFT, HARD) == "old"
+    assert calls == [] and len(jobs) == 1  # the caller did not wait for the reload
+    jobs.pop()()
+    assert calls == ["new"]
+    assert cache.get(("f", 1), loader("newer", calls), SOFT, HARD) == "new"
+    assert cache.metrics.counts["cache.f.stale"] == 1
+
+def test_no_second_refresh_while_one_is_in_flight(cache, jobs):
+    cache.put(("f", 1), time.time() - SOFT - 1, "old")
+    cache.inflight[("f", 1)] = object()  # a load for the key is already running
+    cache.get(("f", 1), loader("new", []), SOFT, HARD)
+    assert jobs == []
+
+def test_entries_past_the_hard_ttl_block_on_a_load(cache, jobs):
+    cache.put(("f", 1), time.time() - HARD - 1, "expired")
+    calls = []
+    assert cache.get(("f", 1), loader("new", calls), SOFT, HARD) == "new"
+    assert calls == ["new"] and jobs == []
+
+def test_concurrent_loads_of_a_key_share_one_call(cache):
+    started, release, calls = threading.Event(), threading.Event(), []
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "v"
+    results = []
+    def call():
+        results.append(cache.load(("f", 1), load, HARD))
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    while cache.metrics.counts["singleflight.coalesced"] < 7:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert results == ["v"] * 8 and calls == [1]
+    assert cache.inflight == {}
+
+def test_a_failed_load_reaches_every_waiter_and_is_not_cached(cache):
+    def load():
+        raise OSError("upstream down")
+    with pytest.raises(OSError):
+        cache.load(("f", 1), load, HARD)
+    assert cache.inflight == {} and cache.lookup(("f", 1)) is None
+
+def test_claim_splits_owned_and_waiting_keys(cache):
+    owned, waiting = cache.claim([("f", 1), ("f", 2)])
+    owned2, waiting2 = cache.claim([("f", 2), ("f", 3)])
+    assert list(owned) == [("f", 1), ("f", 2)] and waiting == {}
+    assert list(owned2) == [("f", 3)] and waiting2 == {("f", 2): owned[("f", 2)]}
+
+def test_fulfil_stores_values_in_key_order_and_resolves_futures(cache):
+    owned, _ = cache.claim([("f", 1), ("f", 2)])
+    cache.fulfil(owned, lambda keys: [k[1] * 10 for k in keys], HARD)
+    assert [f.result(0) for f in owned.values()] == [10, 20]
+    assert cache.lookup(("f", 2))[1] == 20
+    assert cache.inflight == {}
+
+def test_fulfil_fails_every_future_on_error_or_short_result(cache):
+    owned, _ = cache.claim([("f", 1), ("f", 2)])
+    cache.fulfil(owned, lambda keys: 1 / 0, HARD)
+    assert all(isinstance(f.exception(0), ZeroDivisionError) for f in owned.values())
+    owned, _ = cache.claim([("f", 1), ("f", 2), ("f", 3)])
+    cache.fulfil(owned, lambda keys: ["only one"], HARD)
+    assert owned[("f", 1)].result(0) == "only one"
+    assert all(isinstance(owned[k].exception(0), LookupError) for k in [("f", 2), ("f", 3)])
+    assert cache.inflight == {} and cache.lookup(("f", 3)) is None
+
+def test_lru_entries_are_evicted_past_the_byte_budget(cache):
+    blob = b"x" * 3000
+    for i in range(5):
+        cache.put(("f", i), time.time(), blob)
+    cache.lookup(("f", 2))  # recently used: survives
+    cache.put(("f", 5), time.time(), blob)
+    entries, resident = cache.stats()["f"]
+    assert resident <= 10_000 and entries == 3
+    assert [k[1] for k in cache.entries["f"]] == [4, 2, 5]
+    assert cache.metrics.counts["cache.f.evictions"] == 3
+
+def test_an_entry_larger_than_the_budget_is_still_kept(cache):
+    cache.put(("f", 1), time.time(), b"x" * 50_000)
+    assert cache.stats()["f"][0] == 1
+
+def test_disk_tier_promotes_hits_and_ignores_other_schemas(tmp_path, jobs):
+    path = str(tmp_path / "cache.sqlite")
+    SWRCache(DiskCache(path, schema=1), spawn=jobs.append).store(("f", 1), "v", HARD)
+    cache = SWRCache(DiskCache(path, schema=1), spawn=jobs.append)
+    assert cache.lookup(("f", 1)) is None and cache.peek(("f", 1))[1] == "v"
+    assert cache.lookup(("f", 1))[1] == "v"
+    assert SWRCache(DiskCache(path, schema=2)).peek(("f", 1)) is None
+
+def test_disk_tier_prunes_expired_and_oldest_rows(tmp_path):
+    disk = DiskCache(str(tmp_path / "cache.sqlite"), max_rows=6, prune_every=5)
+    now = time.time()
+    def rows():
+        return disk.db.execute("SELECT count(*) FROM cache").fetchone()[0]
+    disk.put(("f", "expired"), now - 100, 10, "x")
+    for i in range(4):
+        disk.put(("f", i), now + i, HARD, i)
+    assert rows() == 4  # 5th write: the expired row is gone
+    for i in range(4, 9):
+        disk.put(("f", i), now + i, HARD, i)
+    assert rows() == 6  # 10th write: the oldest rows past max_rows are gone
+    assert disk.get(("f", 2)) is None and disk.get(("f", 3))[1] == 3
@@ -0,0 +1,81 @@
+# Accuracy of the offline timezone grid against points recorded with timezonefinder 6.5.2
+# (timezone-boundary-builder polygons) around Baarle-Nassau/Baarle-Hertog, where Belgian and
+# Dutch enclaves are smaller than a grid cell. The fixture GeoJSON is the same polygons clipped
+# to 4.7–5.1°E, 51.35–51.55°N and simplified by 5e-5°.
+import json
+import os
+
+import numpy as np
+import pytest
+
+import tzgrid
+
+shapely = pytest.importorskip("shapely")
+import build_tz_grid  # noqa: E402  (needs shapely)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+RES = 0.1
+
+@pytest.fixture(scope="module")
+def features():
+    with open(os.path.join(FIXTURES, "tz_baarle.geojson"), encoding="utf-8") as f:
+        return json.load(f)["features"]
+
+@pytest.fixture(scope="module")
+def points():
+    with open(os.path.join(FIXTURES, "tz_baarle_points.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+@pytest.fixture(scope="module")
+def built(features):
+    return build_tz_grid.build(features, RES)
+
+def cell_of(lat, lon):
+    return int((90 - lat) / RES), int((lon + 180) / RES)
+
+def test_build_rasterizes_zones_and_flags_borders(built, points):
+    grid, names, border = built
+    assert grid.shape == (1800, 3600)
+    assert names == ["", "Europe/Amsterdam", "Europe/Brussels"]
+    assert grid[0, 0] == 0  # outside the fixture polygons
+    flagged = grid & tzgrid.TZ_BORDER != 0
+    for lat, lon, tz in points:
+        v = int(grid[cell_of(lat, lon)])
+        if not v & tzgrid.TZ_BORDER:
+            assert names[v] == tz  # interior cells are exact
+    # every flagged cell inside the fixture has polygon pieces of at least one zone
+    assert set(border["cells"]) <= set(np.flatnonzero(flagged.ravel()))
+    assert len(border["pieces"]) == len(border["cells"]) + 1
+    assert len(border["rings"]) == len(border["zones"]) + 1 == border["pieces"][-1] + 1
+    assert border["rings"][-1] == len(border["xy"])
+
+def test_lookup_matches_recorded_points(built, points, tmp_path):
+    path = str(tmp_path / "tz_grid.npy")
+    tzgrid.save(path, *built)
+    grid = tzgrid.load(path)
+    assert isinstance(grid.grid, np.memmap)
+    wrong = [(lat, lon, tz, grid.lookup(lat, lon)) for lat, lon, tz in points if grid.lookup(lat, lon) != tz]
+    assert wrong == []
+
+def test_cell_values_alone_miss_enclaves(built, points):
+    grid, names, _ = built
+    raster = tzgrid.TimezoneGrid(grid, names)  # no border arrays: the cell value decides
+    wrong = sum(raster.lookup(lat, lon) != tz for lat, lon, tz in points)
+    assert wrong > 0  # the fixture exercises cells that polygon refinement has to fix
+
+def test_contains_even_odd_with_holes():
+    square = [(0, 0), (4, 0), (4, 4), (0, 4), (0, 0)]
+    hole = [(1, 1), (3, 1), (3, 3), (1, 3), (1, 1)]
+    xy = np.array(square + [(np.nan, np.nan)] + hole + [(np.nan, np.nan)], dtype=np.float32)
+    assert tzgrid.contains(xy, 0.5, 0.5)
+    assert not tzgrid.contains(xy, 2, 2)
+    assert not tzgrid.contains(xy, 5, 2)
+
+def test_lookup_wraps_longitudes_past_the_antimeridian():
+    grid = np.zeros((18, 36), np.uint16)
+    grid[:, 0], grid[:, -1] = 1, 2
+    raster = tzgrid.TimezoneGrid(grid, ["", "West", "East"])
+    assert raster.lookup(0, -179.5) == "West"
+    assert raster.lookup(0, 179.5) == "East"
+    assert raster.lookup(0, -180.5) == "East"  # not column 0
+    assert raster.lookup(0, 180.5) == "West"
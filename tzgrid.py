@@ -0,0 +1,67 @@
+# Timezone raster grid: written by build_tz_grid.py, memory-mapped by app.py.
+#
+#   tz_grid.npy           uint16 zone id per cell, row 0 at 90°N, column 0 at 180°W; TZ_BORDER is
+#                         set on cells where another zone is adjacent
+#   tz_grid.json          zone names by id ("" = no zone)
+#   tz_grid.<array>.npy   the zone polygons clipped to each border cell, for exact lookups there:
+#       cells   int64  sorted flat ids (row * width + col) of the border cells
+#       pieces  int64  offsets into zones/rings per cell (len(cells) + 1)
+#       zones   uint16 zone id per piece
+#       rings   int64  offsets into xy per piece (len(zones) + 1)
+#       xy      float32 (lon, lat) vertices of the piece's closed rings, a NaN row after each ring
+import json
+import math
+import os
+
+import numpy as np
+
+TZ_BORDER = 0x8000
+BORDER_ARRAYS = ("cells", "pieces", "zones", "rings", "xy")
+
+def contains(xy: np.ndarray, x: float, y: float) -> bool:
+    """Even-odd ray cast of (x, y) against closed rings separated by NaN rows."""
+    x1, y1, x2, y2 = xy[:-1, 0], xy[:-1, 1], xy[1:, 0], xy[1:, 1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        crosses = (y1 > y) != (y2 > y)  # edges touching a NaN row never count: their x is NaN
+        xs = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return bool(np.count_nonzero(crosses & (x < xs)) % 2)
+
+class TimezoneGrid:
+    def __init__(self, grid: np.ndarray, names: list, border: dict = None):
+        self.grid, self.names, self.border = grid, names, border
+        self.res = 180.0 / grid.shape[0]
+
+    def lookup(self, lat: float, lon: float):
+        h, w = self.grid.shape
+        i = min(max(int((90.0 - lat) / self.res), 0), h - 1)
+        j = math.floor((lon + 180.0) / self.res) % w  # floor: lon < -180 wraps to the last column
+        v = int(self.grid[i, j])
+        if v & TZ_BORDER and self.border is not None:
+            b, cell = self.border, i * w + j
+            k = int(np.searchsorted(b["cells"], cell))
+            if k < len(b["cells"]) and b["cells"][k] == cell:
+                for p in range(b["pieces"][k], b["pieces"][k + 1]):
+                    if contains(b["xy"][b["rings"][p]:b["rings"][p + 1]], lon, lat):
+                        return self.names[int(b["zones"][p])] or None
+        return self.names[v & ~TZ_BORDER] or None  # interior cell, or a point on a piece edge
+
+def sidecar(path: str, name: str) -> str:
+    return f"{os.path.splitext(path)[0]}.{name}.npy"
+
+def save(path: str, grid: np.ndarray, names: list, border: dict):
+    np.save(path, grid)
+    with open(os.path.splitext(path)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump(names, f)
+    for name in BORDER_ARRAYS:
+        np.save(sidecar(path, name), border[name])
+
+def load(path: str) -> TimezoneGrid:
+    """Memory-map a saved grid (OSError when missing); grids without border arrays use cell values only."""
+    grid = np.load(path, mmap_mode="r")
+    with open(os.path.splitext(path)[0] + ".json", encoding="utf-8") as f:
+        names = json.load(f)
+    try:
+        border = {name: np.load(sidecar(path, name), mmap_mode="r") for name in BORDER_ARRAYS}
+    except OSError:
+        border = None
+    return TimezoneGrid(grid, names, border)